@@ -1,13 +1,24 @@
+# Aliased since this module defines its own float builtin
+import builtins as py
+import operator
 import re
 import statistics
-from functools import cmp_to_key
-from typing import Callable, Dict, List, Tuple, Union
+from math import isfinite
+from collections import defaultdict
+from functools import cmp_to_key, lru_cache
+from itertools import chain
+from typing import Callable, DefaultDict, Dict, List, Optional, Union
 
 from mistql.exceptions import (MistQLRuntimeError, MistQLTypeError,
                                OpenAnIssueIfYouGetThisError)
-from mistql.expression import BaseExpression, RefExpression
-from mistql.runtime_value import RuntimeValue, RuntimeValueType, assert_type
-from mistql.stack import Stack, add_runtime_value_to_stack
+from mistql.expression import (
+    BaseExpression,
+    FnExpression,
+    RefExpression,
+    ValueExpression,
+)
+from mistql.runtime_value import RuntimeValue, RuntimeValueType, assert_type, type_name
+from mistql.stack import Stack, add_runtime_value_to_stack, frame_pusher
 
 Args = List[BaseExpression]
 Exec = Callable[[BaseExpression, Stack], RuntimeValue]
@@ -21,20 +32,61 @@ builtins: Dict[str, FunctionDefinitionType] = {}
 
 RVT = RuntimeValueType
 
+# Type sets accepted by assert_type, built once rather than on every call
+_ARRAY_OR_STRING = frozenset((RVT.Array, RVT.String))
+_NUMBER_OR_STRING = frozenset((RVT.Number, RVT.String))
+_STRING_OR_REGEX = frozenset((RVT.String, RVT.Regex))
+
+
+def _raise_arity_error(name: str, min_args: int, max_args: int, arg_count: int):
+    if not min_args < 0 and arg_count < min_args:
+        raise MistQLRuntimeError(f"{name} takes at least {min_args} arguments")
+    raise MistQLRuntimeError(f"{name} takes at most {max_args} arguments")
+
+
+def _wrap_exact(name: str, count: int, fn: FunctionDefinitionType):
+    def wrapped(arguments: Args, stack: Stack, exec: Exec):
+        if len(arguments) != count:
+            _raise_arity_error(name, count, count, len(arguments))
+        return fn(arguments, stack, exec)
+
+    return wrapped
+
+
+def _wrap_min(name: str, min_args: int, fn: FunctionDefinitionType):
+    def wrapped(arguments: Args, stack: Stack, exec: Exec):
+        if len(arguments) < min_args:
+            _raise_arity_error(name, min_args, -1, len(arguments))
+        return fn(arguments, stack, exec)
+
+    return wrapped
+
+
+def _wrap_range(name: str, min_args: int, max_args: int, fn: FunctionDefinitionType):
+    def wrapped(arguments: Args, stack: Stack, exec: Exec):
+        if not min_args <= len(arguments) <= max_args:
+            _raise_arity_error(name, min_args, max_args, len(arguments))
+        return fn(arguments, stack, exec)
+
+    return wrapped
+
 
 def builtin(name: str, min_args: int, max_args: Union[None, int] = None):
-    if max_args is None:
-        max_args = min_args
+    upper: int = min_args if max_args is None else max_args
 
+    # Arity checks run on every builtin call, so pick a wrapper with the
+    # minimal check for this signature up front rather than at call time.
     def builtin_decorator(fn: FunctionDefinitionType) -> FunctionDefinitionType:
-        def wrapped(arguments: Args, stack: Stack, exec: Exec):
-            if not min_args < 0 and len(arguments) < min_args:
-                raise MistQLRuntimeError(f"{name} takes at least {min_args} arguments")
-            if (max_args is not None) and (
-                not max_args < 0 and len(arguments) > max_args
-            ):
-                raise MistQLRuntimeError(f"{name} takes at most {max_args} arguments")
-            return fn(arguments, stack, exec)
+        wrapped: FunctionDefinitionType
+        if upper < 0:
+            if min_args < 0:
+                wrapped = fn
+            else:
+                wrapped = _wrap_min(name, min_args, fn)
+        elif min_args == upper:
+            wrapped = _wrap_exact(name, min_args, fn)
+        else:
+            wrapped = _wrap_range(name, max(min_args, 0), upper, fn)
 
         builtins[name] = wrapped
         return wrapped
@@ -52,7 +104,7 @@ def log(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
 @builtin("reverse", 1)
 def reverse(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     arg = assert_type(exec(arguments[0], stack), RVT.Array)
-    return RuntimeValue.of(list(reversed(arg.value)))
+    return RuntimeValue(RVT.Array, arg.value[::-1])
 
 
 @builtin("-/unary", 1)
@@ -87,7 +139,7 @@ def add(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
         RVT.Array,
     }:
         return RuntimeValue.of(left.value + right.value)
-    raise MistQLTypeError(f"add: {left.type} is not supported")
+    raise MistQLTypeError(f"add: {type_name(left.type)} is not supported")
 
 
 @builtin("-", 2)
@@ -131,9 +183,8 @@ def neq(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
 @builtin("&&", 2)
 def and_fn(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     left = exec(arguments[0], stack)
-    right = exec(arguments[1], stack)
     if left:
-        return right
+        return exec(arguments[1], stack)
     else:
         return left
 
@@ -141,11 +192,10 @@ def and_fn(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
 @builtin("||", 2)
 def or_fn(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     left = exec(arguments[0], stack)
-    right = exec(arguments[1], stack)
     if left:
         return left
     else:
-        return right
+        return exec(arguments[1], stack)
 
 
 @builtin("count", 1)
@@ -168,15 +218,138 @@ def dot(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     return _index_single(RuntimeValue.of(right.name), left)
 
 
+def dot_path(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
+    # Chains like a.b.c are lowered to one call: the base, then each key as a
+    # string value, so the whole path is walked without recursing per dot.
+    # Not registered as a builtin, which would make it show up in $.
+    value = exec(arguments[0], stack)
+    for key in arguments[1:]:
+        value = _index_single(exec(key, stack), value)
+    return value
+
+
+_ARITHMETIC_OPERATORS: Dict[str, Callable[[py.float, py.float], py.float]] = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+    "%": operator.mod,
+}
+
+
+NumericKernel = Callable[[py.float], py.float]
+
+
+class _NonFiniteResult(Exception):
+    pass
+
+
+def _finite(value: py.float) -> py.float:
+    # Non-finite numbers become null between operators, which the next
+    # operator would then reject, so kernels bail out on them instead.
+    if not isfinite(value):
+        raise _NonFiniteResult()
+    return value
+
+
+def _arithmetic_kernel(ast: BaseExpression) -> Optional[NumericKernel]:
+    """
+    Build a python function equivalent to a mutation made only of arithmetic
+    on @ and number literals, e.g. `@ * 2 + 1`. Returns None for anything
+    else. The result is unchecked; intermediate results are checked so that
+    non-finite values raise _NonFiniteResult.
+    """
+    if type(ast) is not FnExpression:
+        return None
+    fn = ast.fn
+    if type(fn) is not RefExpression or not fn.absolute:
+        return None
+    if fn.name == "-/unary" and len(ast.args) == 1:
+        operand = _arithmetic_operand(ast.args[0])
+        if operand is None:
+            return None
+        # Narrowed values are rebound to non-Optional locals throughout, as
+        # mypy doesn't carry narrowing into the closures.
+        negated: NumericKernel = operand
+        return lambda x: -negated(x)
+    op = _ARITHMETIC_OPERATORS.get(fn.name)
+    if op is None or len(ast.args) != 2:
+        return None
+    binary_op: Callable[[py.float, py.float], py.float] = op
+    left_ast, right_ast = ast.args
+    # The shapes `@ op number` and `number op @` are by far the most common,
+    # so they get a closure that skips calling out for each operand.
+    right_constant = _number_literal(right_ast)
+    if right_constant is not None and _is_item_ref(left_ast):
+        right_value: py.float = right_constant
+        return lambda x: binary_op(x, right_value)
+    left_constant = _number_literal(left_ast)
+    if left_constant is not None and _is_item_ref(right_ast):
+        left_value: py.float = left_constant
+        return lambda x: binary_op(left_value, x)
+    left = _arithmetic_operand(left_ast)
+    right = _arithmetic_operand(right_ast)
+    if left is None or right is None:
+        return None
+    left_kernel: NumericKernel = left
+    right_kernel: NumericKernel = right
+    return lambda x: binary_op(left_kernel(x), right_kernel(x))
+
+
+def _arithmetic_operand(ast: BaseExpression) -> Optional[NumericKernel]:
+    if _is_item_ref(ast):
+        return lambda x: x
+    constant = _number_literal(ast)
+    if constant is not None:
+        value: py.float = constant
+        return lambda x: value
+    kernel = _arithmetic_kernel(ast)
+    if kernel is None:
+        return None
+    checked: NumericKernel = kernel
+    return lambda x: _finite(checked(x))
+
+
+def _map_arithmetic(
+    mutation: BaseExpression, items: List[RuntimeValue]
+) -> Optional[List[RuntimeValue]]:
+    """
+    Evaluate arithmetic mutations over an array of numbers directly, without
+    pushing a stack frame per item. Returns None when the mutation or the
+    items don't fit, or when an intermediate result isn't finite.
+    """
+    kernel = _arithmetic_kernel(mutation)
+    if kernel is None:
+        return None
+    if not all(item.type == RVT.Number for item in items):
+        return None
+    of = RuntimeValue.of
+    try:
+        return [of(kernel(item.value)) for item in items]
+    except _NonFiniteResult:
+        return None
+
+
+def _is_item_ref(ast: BaseExpression) -> bool:
+    return type(ast) is RefExpression and ast.name == "@" and not ast.absolute
+
+
+def _number_literal(ast: BaseExpression) -> Optional[py.float]:
+    if type(ast) is ValueExpression and ast.value.type == RVT.Number:
+        return ast.value.value
+    return None
+
+
 @builtin("map", 2)
 def map(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     mutation = arguments[0]
     operand = assert_type(exec(arguments[1], stack), RVT.Array)
-    out: List[RuntimeValue] = []
-    for item in operand.value:
-        res = exec(mutation, add_runtime_value_to_stack(item, stack))
-        out.append(res)
-    return RuntimeValue.of(out)
+    fast = _map_arithmetic(mutation, operand.value)
+    if fast is not None:
+        return RuntimeValue(RVT.Array, fast)
+    push = frame_pusher(stack)
+    out = [exec(mutation, push(item)) for item in operand.value]
+    return RuntimeValue(RVT.Array, out)
 
 
 @builtin("reduce", 3)
@@ -184,10 +357,12 @@ def reduce(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     mutation = arguments[0]
     initial = exec(arguments[1], stack)
     operand = assert_type(exec(arguments[2], stack), RVT.Array)
+    push = frame_pusher(stack)
+    array_type = RVT.Array
     out = initial
     for item in operand.value:
-        acc_cur = RuntimeValue.of([out, item])
-        out = exec(mutation, add_runtime_value_to_stack(acc_cur, stack))
+        acc_cur = RuntimeValue(array_type, [out, item])
+        out = exec(mutation, push(acc_cur))
     return out
 
 
@@ -195,69 +370,72 @@ def reduce(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
 def filter(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     mutation = arguments[0]
     operand = assert_type(exec(arguments[1], stack), RVT.Array)
-    out: List[RuntimeValue] = []
-    for item in operand.value:
-        res = exec(mutation, add_runtime_value_to_stack(item, stack))
-        if res:
-            out.append(item)
-    return RuntimeValue.of(out)
+    push = frame_pusher(stack)
+    out = [item for item in operand.value if exec(mutation, push(item))]
+    return RuntimeValue(RVT.Array, out)
 
 
 @builtin("mapvalues", 2)
 def mapvalues(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     mutation = arguments[0]
     operand = assert_type(exec(arguments[1], stack), RVT.Object)
-    out: Dict[str, RuntimeValue] = {}
-    for key, value in operand.value.items():
-        res = exec(mutation, add_runtime_value_to_stack(value, stack))
-        out[key] = res
-    return RuntimeValue.of(out)
+    push = frame_pusher(stack)
+    out = {
+        key: exec(mutation, push(value))
+        for key, value in operand.value.items()
+    }
+    return RuntimeValue(RVT.Object, out)
 
 
 @builtin("mapkeys", 2)
 def mapkeys(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     mutation = arguments[0]
     operand = assert_type(exec(arguments[1], stack), RVT.Object)
+    push = frame_pusher(stack)
+    of = RuntimeValue.of
     out: Dict[str, RuntimeValue] = {}
     for key, value in operand.value.items():
-        res = exec(mutation, add_runtime_value_to_stack(RuntimeValue.of(key), stack))
+        res = exec(mutation, push(of(key)))
         out[res.to_string()] = value
-    return RuntimeValue.of(out)
+    return RuntimeValue(RVT.Object, out)
 
 
 @builtin("filtervalues", 2)
 def filtervalues(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     mutation = arguments[0]
     operand = assert_type(exec(arguments[1], stack), RVT.Object)
-    out: Dict[str, RuntimeValue] = {}
-    for key, value in operand.value.items():
-        res = exec(mutation, add_runtime_value_to_stack(value, stack))
-        if res:
-            out[key] = value
-    return RuntimeValue.of(out)
+    push = frame_pusher(stack)
+    out = {
+        key: value
+        for key, value in operand.value.items()
+        if exec(mutation, push(value))
+    }
+    return RuntimeValue(RVT.Object, out)
 
 
 @builtin("filterkeys", 2)
 def filterkeys(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     mutation = arguments[0]
     operand = assert_type(exec(arguments[1], stack), RVT.Object)
-    out: Dict[str, RuntimeValue] = {}
-    for key, value in operand.value.items():
-        res = exec(mutation, add_runtime_value_to_stack(RuntimeValue.of(key), stack))
-        if res:
-            out[key] = value
-    return RuntimeValue.of(out)
+    push = frame_pusher(stack)
+    of = RuntimeValue.of
+    out = {
+        key: value
+        for key, value in operand.value.items()
+        if exec(mutation, push(of(key)))
+    }
+    return RuntimeValue(RVT.Object, out)
 
 
 @builtin("find", 2)
 def find(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     mutation = arguments[0]
     operand = assert_type(exec(arguments[1], stack), RVT.Array)
+    push = frame_pusher(stack)
     for item in operand.value:
-        res = exec(mutation, add_runtime_value_to_stack(item, stack))
-        if res:
+        if exec(mutation, push(item)):
             return item
-    return RuntimeValue.of(None)
+    return RuntimeValue.NULL
 
 
 @builtin("apply", 2)
@@ -266,12 +444,18 @@ def apply(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     return exec(arguments[0], add_runtime_value_to_stack(target, stack))
 
 
+def _as_integer_index(value: py.float) -> int:
+    if not value.is_integer():
+        raise MistQLRuntimeError("index: Non-integers cannot be used on arrays")
+    return int(value)
+
+
 def _index_double(
     index_one: RuntimeValue,
     index_two: RuntimeValue,
     operand: RuntimeValue,
 ):
-    assert_type(operand, {RVT.Array, RVT.String})
+    assert_type(operand, _ARRAY_OR_STRING)
 
     if index_one.type == RVT.Null:
         index_one = RuntimeValue.of(0)
@@ -279,35 +463,31 @@ def _index_double(
         index_two = RuntimeValue.of(len(operand.value))
     if index_one.type != RVT.Number or index_two.type != RVT.Number:
         raise MistQLRuntimeError("index: Non-numbers cannot be used on arrays")
-    index_one_num = index_one.value
-    index_two_num = index_two.value
-    if index_one_num % 1 != 0 or index_two_num % 1 != 0:
-        raise MistQLRuntimeError("index: Non-integers cannot be used on arrays")
+    index_one_num = _as_integer_index(index_one.value)
+    index_two_num = _as_integer_index(index_two.value)
     if index_one_num < 0:
         index_one_num = len(operand.value) + index_one_num
     if index_two_num < 0:
         index_two_num = len(operand.value) + index_two_num
-    return RuntimeValue.of(operand.value[int(index_one_num) : int(index_two_num)])
+    return RuntimeValue.of(operand.value[index_one_num:index_two_num])
 
 
 def _index_single(index: RuntimeValue, operand: RuntimeValue):
     if operand.type == RVT.Array or operand.type == RVT.String:
         assert_type(index, RVT.Number)
-        index_num = index.value
-        if index_num % 1 != 0:
-            raise MistQLRuntimeError("index: Non-integers cannot be used on arrays")
-        if index_num < 0:
-            index_num = len(operand.value) + index_num
-        if index_num < 0 or index_num >= len(operand.value):
-            return RuntimeValue.of(None)
-        return RuntimeValue.of(operand.value[int(index_num)])
+        index_num = _as_integer_index(index.value)
+        length = len(operand.value)
+        # Python's own negative indexing matches ours within these bounds
+        if -length <= index_num < length:
+            return RuntimeValue.of(operand.value[index_num])
+        return RuntimeValue.NULL
     elif operand.type == RVT.Object:
         return operand.access(assert_type(index, RVT.String).value)
     elif operand.type == RVT.Null:
-        assert_type(index, {RVT.Number, RVT.String})
-        return RuntimeValue.of(None)
+        assert_type(index, _NUMBER_OR_STRING)
+        return RuntimeValue.NULL
     else:
-        raise MistQLRuntimeError(f"index: Cannot index {operand.type}")
+        raise MistQLRuntimeError(f"index: Cannot index {type_name(operand.type)}")
 
 
 @builtin("index", 2, 3)
@@ -332,6 +512,12 @@ def float(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     return RuntimeValue.of(exec(arguments[0], stack).to_float())
 
 
+@lru_cache(maxsize=512)
+def _compile_regex(pattern: str, flags: int = 0) -> "re.Pattern[str]":
+    # Regexes are typically built inside map/filter bodies, once per item
+    return re.compile(pattern, flags)
+
+
 @builtin("regex", 1, 2)
 def regex(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     pattern = assert_type(exec(arguments[0], stack), RVT.String)
@@ -358,38 +544,49 @@ def regex(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
 
     return RuntimeValue(
         RVT.Regex,
-        re.compile(pattern.value, flags=flags_int),
+        _compile_regex(pattern.value, flags_int),
         modifiers={"global": is_global},
     )
 
 
+def _check_sortable_same_type(keys: List[RuntimeValue]) -> bool:
+    """
+    Check that the keys are comparable, returning whether they all share a
+    type. Comparable values of a single type order the same way as their
+    underlying python values, so those can be sorted without compare.
+    """
+    if not all(key.comparable() for key in keys):
+        raise MistQLRuntimeError("sort: Cannot sort non-comparable values")
+    return len({key.type for key in keys}) <= 1
+
+
 @builtin("sort", 1)
 def sort(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     arg = assert_type(exec(arguments[0], stack), RVT.Array)
-    for entry in arg.value:
-        if not entry.comparable():
-            raise MistQLRuntimeError("sort: Cannot sort non-comparable values")
-    return RuntimeValue.of(
-        list(sorted(arg.value, key=cmp_to_key(RuntimeValue.compare)))
+    if _check_sortable_same_type(arg.value):
+        raw_sorted = sorted(arg.value, key=operator.attrgetter("value"))
+        return RuntimeValue(RVT.Array, raw_sorted)
+    return RuntimeValue(
+        RVT.Array, sorted(arg.value, key=cmp_to_key(RuntimeValue.compare))
     )
 
 
 @builtin("sortby", 2)
 def sortby(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     target = assert_type(exec(arguments[1], stack), RVT.Array)
-    WithKey = List[Tuple[RuntimeValue, RuntimeValue]]
-    with_key: WithKey = []
-    for item in target.value:
-        key = exec(arguments[0], add_runtime_value_to_stack(item, stack))
-        if not key.comparable():
-            raise MistQLRuntimeError("sort: Cannot sort non-comparable values")
-        with_key.append((key, item))
+    mutation = arguments[0]
+    push = frame_pusher(stack)
+    keys = [exec(mutation, push(item)) for item in target.value]
+    if _check_sortable_same_type(keys):
+        raw_keys = [key.value for key in keys]
+        order = sorted(range(len(keys)), key=raw_keys.__getitem__)
+    else:
 
-    def cmp(a: Tuple[RuntimeValue, RuntimeValue], b: Tuple[RuntimeValue, RuntimeValue]):
-        return RuntimeValue.compare(a[0], b[0])
+        def _cmp(a: int, b: int) -> int:
+            return RuntimeValue.compare(keys[a], keys[b])
 
-    post_sort = list(sorted(with_key, key=cmp_to_key(cmp)))
-    return RuntimeValue.of([value for key, value in post_sort])
+        order = sorted(range(len(keys)), key=cmp_to_key(_cmp))
+    return RuntimeValue(RVT.Array, [target.value[idx] for idx in order])
 
 
 @builtin("<", 2)
@@ -416,63 +613,74 @@ def gte(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
 def values(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     target = exec(arguments[0], stack)
     values = [target.access(key) for key in target.keys()]
-    return RuntimeValue.of(values)
+    return RuntimeValue(RVT.Array, values)
 
 
 @builtin("groupby", 2)
 def groupby(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     target = assert_type(exec(arguments[1], stack), RVT.Array)
     mut = arguments[0]
-    groups: Dict[str, List[RuntimeValue]] = {}
+    groups: DefaultDict[str, List[RuntimeValue]] = defaultdict(list)
+    push = frame_pusher(stack)
     for item in target.value:
-        key = exec(mut, add_runtime_value_to_stack(item, stack)).to_string()
-        if key not in groups:
-            groups[key] = []
+        result = exec(mut, push(item))
+        # Same String fast path as stringjoin
+        key = result.value if result.type == RVT.String else result.to_string()
         groups[key].append(item)
-    return RuntimeValue.of(groups)
+    return RuntimeValue(
+        RVT.Object,
+        {key: RuntimeValue(RVT.Array, group) for key, group in groups.items()},
+    )
 
 
 @builtin("withindices", 1)
 def withindices(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     target = assert_type(exec(arguments[0], stack), RVT.Array)
-    return RuntimeValue.of(list(enumerate(target.value)))
+    return RuntimeValue(
+        RVT.Array,
+        [
+            RuntimeValue(RVT.Array, [RuntimeValue.of(idx), item])
+            for idx, item in enumerate(target.value)
+        ],
+    )
 
 
 @builtin("entries", 1)
 def entries(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     target = exec(arguments[0], stack)
-    entries = [[key, target.access(key)] for key in target.keys()]
-    return RuntimeValue.of(entries)
+    entries = [
+        RuntimeValue(RVT.Array, [RuntimeValue.of(key), target.access(key)])
+        for key in target.keys()
+    ]
+    return RuntimeValue(RVT.Array, entries)
 
 
 @builtin("fromentries", 1)
 def fromentries(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     target = assert_type(exec(arguments[0], stack), RVT.Array)
-    res = {}
+    null = RuntimeValue.NULL
+    res: Dict[str, RuntimeValue] = {}
     for entry in target.value:
-        assert_type(entry, RVT.Array)
-        if len(entry.value) > 0:
-            first = entry.value[0]
-        else:
-            first = RuntimeValue.of(None)
-
-        if len(entry.value) > 1:
-            second = entry.value[1]
+        pair = assert_type(entry, RVT.Array).value
+        if len(pair) > 1:
+            first, second = pair[0], pair[1]
         else:
-            second = RuntimeValue.of(None)
-        res[first.to_string()] = second
-    return RuntimeValue.of(res)
+            first = pair[0] if pair else null
+            second = null
+        key = first.value if first.type == RVT.String else first.to_string()
+        res[key] = second
+    return RuntimeValue(RVT.Object, res)
 
 
 @builtin("match", 2)
 def match(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     pattern = exec(arguments[0], stack)
     target = exec(arguments[1], stack)
-    assert_type(pattern, {RVT.String, RVT.Regex})
+    assert_type(pattern, _STRING_OR_REGEX)
     if pattern.type == RVT.Regex:
         return RuntimeValue.of(bool(pattern.value.search(target.value)))
     elif pattern.type == RVT.String:
-        compiled = re.compile(pattern.value)
+        compiled = _compile_regex(pattern.value)
         return RuntimeValue.of(bool(compiled.search(target.value)))
     raise OpenAnIssueIfYouGetThisError(
         "Unexpectedly reaching end of function in match call."
@@ -489,9 +697,9 @@ def replace(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     pattern = exec(arguments[0], stack)
     replacement = exec(arguments[1], stack)
     target = exec(arguments[2], stack)
-    assert_type(pattern, {RVT.String, RVT.Regex})
+    assert_type(pattern, _STRING_OR_REGEX)
     if pattern.type == RVT.Regex:
-        if pattern.modifiers["global"]:
+        if pattern.modifiers and pattern.modifiers["global"]:
             res = pattern.value.sub(replacement.value, target.value)
         else:
             res = pattern.value.sub(replacement.value, target.value, 1)
@@ -507,7 +715,7 @@ def replace(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
 
 @builtin("split", 2)
 def split(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
-    delimiter = assert_type(exec(arguments[0], stack), {RVT.String, RVT.Regex})
+    delimiter = assert_type(exec(arguments[0], stack), _STRING_OR_REGEX)
     target = assert_type(exec(arguments[1], stack), RVT.String)
     if delimiter.type == RVT.String:
         separator = delimiter.value
@@ -525,8 +733,14 @@ def split(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
 def stringjoin(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     delimiter = assert_type(exec(arguments[0], stack), RVT.String)
     target = assert_type(exec(arguments[1], stack), RVT.Array)
-    arr = [entry.to_string() for entry in target.value]
-    return RuntimeValue.of(delimiter.value.join(arr))
+    # Strings are by far the common case, so skip the to_string dispatch for them
+    joined = delimiter.value.join(
+        [
+            entry.value if entry.type == RVT.String else entry.to_string()
+            for entry in target.value
+        ]
+    )
+    return RuntimeValue.of(joined)
 
 
 @builtin("sum", 1)
@@ -541,9 +755,8 @@ def sum(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
 @builtin("summarize", 1)
 def summarize(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     target = assert_type(exec(arguments[0], stack), RVT.Array)
-    for entry in target.value:
-        assert_type(entry, RVT.Number)
-    arr = target.to_python()
+    # Type checking and unwrapping happen in the same pass
+    arr = [assert_type(entry, RVT.Number).value for entry in target.value]
     summary = {
         "max": max(arr),
         "min": min(arr),
@@ -555,17 +768,21 @@ def summarize(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     return RuntimeValue.of(summary)
 
 
-def _sequence_helper(arr: List[List[bool]], start=0) -> List[List[int]]:
-    firstArray = arr[0]
+def _sequence_helper(
+    masks: List[int], depth: int = 0, start: int = 0
+) -> List[List[int]]:
+    # Each mask has bit i set when item i satisfies the predicate at that depth
+    mask = masks[depth] >> start << start
     result: List[List[int]] = []
-    for idx in range(start, len(firstArray)):
-        if firstArray[idx]:
-            if len(arr) == 1:
-                result.append([idx])
-            else:
-                subResult = _sequence_helper(arr[1:], idx + 1)
-                for i in range(len(subResult)):
-                    result.append([idx] + subResult[i])
+    while mask:
+        lowest = mask & -mask
+        idx = lowest.bit_length() - 1
+        if depth == len(masks) - 1:
+            result.append([idx])
+        else:
+            for rest in _sequence_helper(masks, depth + 1, idx + 1):
+                result.append([idx] + rest)
+        mask ^= lowest
     return result
 
 
@@ -573,25 +790,25 @@ def _sequence_helper(arr: List[List[bool]], start=0) -> List[List[int]]:
 def sequence(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     predicates = arguments[:-1]
     target = assert_type(exec(arguments[-1], stack), RVT.Array)
-    bitmasks: List[List[bool]] = []
+    items = target.value
+    push = frame_pusher(stack)
+    bitmasks: List[int] = []
     for predicate in predicates:
-        bitmask = []
-        for i in range(len(target.value)):
-            item = target.value[i]
-            value = exec(predicate, add_runtime_value_to_stack(item, stack))
-            bitmask.append(value.truthy())
-        bitmasks.append(bitmask)
+        bits = "".join(
+            ["1" if exec(predicate, push(item)) else "0" for item in items]
+        )
+        # Item 0 is the lowest bit, so the string is reversed before parsing
+        bitmasks.append(int(bits[::-1] or "0", 2))
     indices_map = _sequence_helper(bitmasks)
-    result: List[List[int]] = [
-        [target.value[idx] for idx in indices] for indices in indices_map
+    result: List[RuntimeValue] = [
+        RuntimeValue(RVT.Array, [target.value[idx] for idx in indices])
+        for indices in indices_map
     ]
-    return RuntimeValue.of(result)
+    return RuntimeValue(RVT.Array, result)
 
 
 @builtin("flatten", 1)
 def flatten(arguments: Args, stack: Stack, exec: Exec) -> RuntimeValue:
     target = assert_type(exec(arguments[0], stack), RVT.Array)
-    result: List[RuntimeValue] = []
-    for entry in target.value:
-        result.extend(assert_type(entry, RVT.Array).value)
-    return RuntimeValue.of(result)
+    nested = [assert_type(entry, RVT.Array).value for entry in target.value]
+    return RuntimeValue(RVT.Array, list(chain.from_iterable(nested)))
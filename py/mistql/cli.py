@@ -9,6 +9,11 @@ import json
 import logging
 import json_lines
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
 log = logging.getLogger(__name__)
 
 parser = argparse.ArgumentParser(
@@ -38,6 +43,18 @@ parser.add_argument(
 )
 
 
+def _load_json(raw_data: Union[str, bytes]):
+    # orjson is much faster on large inputs, but only reads utf-8 and rejects
+    # some inputs the json module accepts (e.g. NaN), so fall back to json
+    # whenever it can't handle the data.
+    if orjson is not None:
+        try:
+            return orjson.loads(raw_data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw_data)
+
+
 def main(supplied_args=None):
     if supplied_args is None:
         args = parser.parse_args()
@@ -60,7 +77,7 @@ def main(supplied_args=None):
         raw_data = sys.stdin.buffer.read()
 
     if not args.file_jsonl:
-        data = json.loads(raw_data)
+        data = _load_json(raw_data)
         out = query(args.query, data)
     if args.output:
         # TODO: Allow alternate output encodings other than utf-8
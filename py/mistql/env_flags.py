@@ -0,0 +1,20 @@
+import os
+from typing import Callable, TypeVar
+
+# Runtime type checking inspects every call, which dominates the cost of the
+# interpreter's hot path, so it is opt-in for debugging.
+TYPEGUARD = os.environ.get("MISTQL_TYPEGUARD", "") not in ("", "0")
+
+F = TypeVar("F", bound=Callable)
+
+
+def typechecked(fn: F) -> F:
+    """
+    Apply typeguard's typechecked only when MISTQL_TYPEGUARD is set
+    """
+    if TYPEGUARD:
+        # Only imported when enabled, so normal use doesn't pay for loading it
+        from typeguard import typechecked as _typechecked
+
+        return _typechecked(fn)
+    return fn
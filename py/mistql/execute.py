@@ -1,7 +1,6 @@
-from typing import List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from mistql.runtime_value import RuntimeValue, RuntimeValueType
 from mistql.expression import (
-    Expression,
     RefExpression,
     FnExpression,
     ValueExpression,
@@ -10,17 +9,29 @@ from mistql.expression import (
     PipeExpression,
 )
 from mistql.stack import Stack
-from mistql.builtins import FunctionDefinitionType, builtins
-from mistql.stack import add_runtime_value_to_stack, build_initial_stack, find_in_stack
+from mistql.builtins import FunctionDefinitionType, builtins, dot_path
+from mistql.stack import (
+    build_builtin_frame,
+    build_initial_stack,
+    frame_pusher,
+    find_in_stack,
+)
 from mistql.expression import BaseExpression
-from mistql.exceptions import MistQLTypeError, OpenAnIssueIfYouGetThisError
+from mistql.exceptions import (
+    MistQLReferenceError,
+    MistQLTypeError,
+    OpenAnIssueIfYouGetThisError,
+)
 
-from typeguard import typechecked
+from mistql.env_flags import typechecked
 
 
 @typechecked
 def execute_fncall(head: BaseExpression, arguments: List[BaseExpression], stack: Stack):
-    fn = execute(head, stack)
+    if type(head) is RefExpression and head.resolved is not None:
+        fn = head.resolved
+    else:
+        fn = execute(head, stack)
     if fn.type != RuntimeValueType.Function:
         raise MistQLTypeError(f"Tried to call a non-function: {fn}")
     # Not enforced, but definitely should be.
@@ -28,46 +39,301 @@ def execute_fncall(head: BaseExpression, arguments: List[BaseExpression], stack:
     return function_definition(arguments, stack, execute)
 
 
+# Pipe stages that can be fused into a single pass over an array, keyed by
+# the builtin they resolve to. The value marks whether the stage is a filter.
+_FUSABLE_STAGES = {builtins["map"]: False, builtins["filter"]: True}
+
+FusedStages = List[Tuple[bool, BaseExpression]]
+
+
+def _single_arg_stage(
+    stage_ast: BaseExpression,
+) -> Optional[Tuple[RefExpression, BaseExpression]]:
+    # The function ref and argument of a stage shaped like `map expr`. Only
+    # the shape is checked, so this costs no stack lookups.
+    if type(stage_ast) is not FnExpression or len(stage_ast.args) != 1:
+        return None
+    fn_ast = stage_ast.fn
+    if type(fn_ast) is not RefExpression or fn_ast.name == "@":
+        return None
+    return fn_ast, stage_ast.args[0]
+
+
+def _find_fusable_run(
+    stages: List[BaseExpression], start: int, stack: Stack
+) -> FusedStages:
+    # Names are resolved at runtime, since data keys can shadow map and filter.
+    # Array stack frames only hold "@", so every stage in the run resolves its
+    # function against the same stack.
+    run: FusedStages = []
+    for stage_ast in stages[start:]:
+        shape = _single_arg_stage(stage_ast)
+        if shape is None:
+            break
+        fn_ast, arg = shape
+        if fn_ast.resolved is not None:
+            fn = fn_ast.resolved
+        else:
+            try:
+                fn = find_in_stack(stack, fn_ast.name, fn_ast.absolute)
+            except MistQLReferenceError:
+                break
+        if fn.type != RuntimeValueType.Function or fn.value not in _FUSABLE_STAGES:
+            break
+        run.append((_FUSABLE_STAGES[fn.value], arg))
+    return run
+
+
+def _execute_fused(run: FusedStages, data: RuntimeValue, stack: Stack) -> RuntimeValue:
+    push = frame_pusher(stack)
+    out = []
+    for item in data.value:
+        for is_filter, mutation in run:
+            result = execute(mutation, push(item))
+            if not is_filter:
+                item = result
+            elif not result:
+                break
+        else:
+            out.append(item)
+    return RuntimeValue(RuntimeValueType.Array, out)
+
+
 @typechecked
 def execute_pipe(stages: List[BaseExpression], stack: Stack) -> RuntimeValue:
-    first: BaseExpression = stages[0]
-    remaining: List[BaseExpression] = stages[1:]
-    data = execute(first, stack)
+    data = execute(stages[0], stack)
+    # Each stage is done with its stack once it returns, so one frame is
+    # refilled for every stage rather than copying the stack each time.
+    push = frame_pusher(stack)
 
-    for stage_ast in remaining:
-        new_stack = add_runtime_value_to_stack(data, stack)
+    idx = 1
+    while idx < len(stages):
+        stage_ast = stages[idx]
+        if (
+            data.type == RuntimeValueType.Array
+            and idx + 1 < len(stages)
+            and _single_arg_stage(stage_ast) is not None
+            and _single_arg_stage(stages[idx + 1]) is not None
+        ):
+            # Runs of map/filter stages are applied item by item rather than
+            # materializing an intermediate array between every stage. The
+            # stack is only probed when the next two stages have the right
+            # shape, since execute_fncall looks the name up again otherwise.
+            run = _find_fusable_run(stages, idx, stack)
+            if len(run) > 1:
+                data = _execute_fused(run, data, stack)
+                idx += len(run)
+                continue
+        new_stack = push(data)
         if not isinstance(stage_ast, FnExpression):
             raise OpenAnIssueIfYouGetThisError("Pipe stage is not a function!!")
-        args: List[BaseExpression] = stage_ast.args.copy()
-        args.append(ValueExpression(data))
-        stage = FnExpression(stage_ast.fn, args)
-        data = execute(stage, new_stack)
+        # The stage AST is left untouched since it may be shared between
+        # evaluations, but there's no need to wrap the call in a new node.
+        args: List[BaseExpression] = stage_ast.args + [ValueExpression(data)]
+        data = execute_fncall(stage_ast.fn, args, new_stack)
+        idx += 1
 
     return data
 
 
+# Evaluated children are already RuntimeValues, so the results are built
+# directly rather than passing back through RuntimeValue.of.
+def _execute_array(ast: ArrayExpression, stack: Stack) -> RuntimeValue:
+    return RuntimeValue(
+        RuntimeValueType.Array, [execute(item, stack) for item in ast.items]
+    )
+
+
+def _execute_object(ast: ObjectExpression, stack: Stack) -> RuntimeValue:
+    values = [execute(value, stack) for value in ast.entry_values]
+    return RuntimeValue(RuntimeValueType.Object, dict(zip(ast.entry_keys, values)))
+
+
+# Keyed on the exact expression class, so each node costs a single dict lookup
+# rather than a walk down an isinstance chain.
+_EXECUTORS: Dict[type, Callable[[Any, Stack], RuntimeValue]] = {
+    FnExpression: lambda ast, stack: execute_fncall(ast.fn, ast.args, stack),
+    ArrayExpression: _execute_array,
+    ObjectExpression: _execute_object,
+    PipeExpression: lambda ast, stack: execute_pipe(ast.stages, stack),
+}
+
+
 @typechecked
 def execute(ast: BaseExpression, stack: Stack) -> RuntimeValue:
+    # Values, refs and bound calls are the most common nodes, so they skip
+    # the table
+    if type(ast) is ValueExpression:
+        return ast.value
+    if type(ast) is RefExpression:
+        if ast.resolved is not None:
+            return ast.resolved
+        return find_in_stack(stack, ast.name, ast.absolute)
+    if type(ast) is FnExpression and ast.resolved_fn is not None:
+        return ast.resolved_fn(ast.args, stack, execute)
+    executor = _EXECUTORS.get(type(ast))
+    if executor is not None:
+        return executor(ast, stack)
     if not isinstance(ast, BaseExpression):
         raise OpenAnIssueIfYouGetThisError(
             f"Expected to evaluate an expression, got {ast}"
         )
-    if isinstance(ast, ValueExpression):
-        return ast.value
-    elif isinstance(ast, RefExpression):
-        return find_in_stack(stack, ast.name, ast.absolute)
+    raise NotImplementedError("execute() not implemented for " + str(ast.type))
+
+
+_builtin_frame = build_builtin_frame(builtins)
+
+
+def _is_dot(ast: FnExpression) -> bool:
+    fn = ast.fn
+    return (
+        isinstance(fn, RefExpression)
+        and fn.absolute
+        and fn.name == "."
+        and len(ast.args) == 2
+    )
+
+
+# Flattened paths call dot_path through a ref that's bound up front, since
+# the function isn't in the builtin frame for the ref to be looked up in.
+_path_ref = RefExpression("./path", absolute=True)
+_path_ref.resolved = RuntimeValue.create_function(dot_path)
+
+
+def _path_call(args: List[BaseExpression]) -> FnExpression:
+    call = FnExpression(_path_ref, args)
+    call.resolved_fn = dot_path
+    return call
+
+
+def _is_path(ast: BaseExpression) -> bool:
+    return isinstance(ast, FnExpression) and ast.fn is _path_ref
+
+
+def flatten_paths(ast: BaseExpression) -> BaseExpression:
+    """
+    Rewrite chains of dot accesses such as a.b.c into a single ./path call.
+    """
+    if isinstance(ast, FnExpression):
+        ast.fn = flatten_paths(ast.fn)
+        ast.args = [flatten_paths(arg) for arg in ast.args]
+        if not _is_dot(ast):
+            return ast
+        base, ref = ast.args
+        if not isinstance(ref, RefExpression):
+            # Leave the dot builtin to report the error
+            return ast
+        key = ValueExpression.of(ref.name)
+        if isinstance(base, FnExpression) and _is_path(base):
+            return _path_call(base.args + [key])
+        return _path_call([base, key])
+    elif isinstance(ast, ArrayExpression):
+        ast.items = [flatten_paths(item) for item in ast.items]
+    elif isinstance(ast, ObjectExpression):
+        return ObjectExpression(
+            {key: flatten_paths(value) for key, value in ast.entries.items()}
+        )
+    elif isinstance(ast, PipeExpression):
+        first, *remaining = ast.stages
+        # Later stages have to stay function calls, so only their contents
+        # are rewritten.
+        for stage in remaining:
+            if isinstance(stage, FnExpression):
+                stage.fn = flatten_paths(stage.fn)
+                stage.args = [flatten_paths(arg) for arg in stage.args]
+        ast.stages = [flatten_paths(first)] + remaining
+    return ast
+
+
+def resolve_builtins(ast: BaseExpression) -> BaseExpression:
+    """
+    Bind absolute refs in the tree to their builtin ahead of execution.
+    Absolute refs only look at the builtin frame, which is the same for every
+    query. Other names can be shadowed by keys in the data, so those are left
+    to be looked up on the stack.
+    """
+    if isinstance(ast, RefExpression):
+        if ast.absolute and ast.name in _builtin_frame:
+            ast.resolved = _builtin_frame[ast.name]
     elif isinstance(ast, FnExpression):
-        return execute_fncall(ast.fn, ast.args, stack)
+        resolve_builtins(ast.fn)
+        for arg in ast.args:
+            resolve_builtins(arg)
+        if isinstance(ast.fn, RefExpression) and ast.fn.resolved is not None:
+            ast.resolved_fn = ast.fn.resolved.value
+    elif isinstance(ast, ArrayExpression):
+        for item in ast.items:
+            resolve_builtins(item)
+    elif isinstance(ast, ObjectExpression):
+        for value in ast.entry_values:
+            resolve_builtins(value)
+    elif isinstance(ast, PipeExpression):
+        for stage in ast.stages:
+            resolve_builtins(stage)
+    return ast
+
+
+# Operators whose result depends only on their arguments
+_FOLDABLE_OPERATORS = {
+    "+", "-", "*", "/", "%", "-/unary", "!/unary",
+    "==", "!=", "<", "<=", ">", ">=", "&&", "||", "index",
+}
+
+
+def fold_constants(ast: BaseExpression) -> BaseExpression:
+    """
+    Collapse literal arrays and objects, and operator calls on literals,
+    into single values so they aren't rebuilt on every execution. Expects
+    refs to already be bound by resolve_builtins.
+    """
+    if isinstance(ast, FnExpression):
+        ast.args = [fold_constants(arg) for arg in ast.args]
+        fn = ast.fn
+        if not (
+            isinstance(fn, RefExpression)
+            and fn.resolved is not None
+            and fn.name in _FOLDABLE_OPERATORS
+            and all(isinstance(arg, ValueExpression) for arg in ast.args)
+        ):
+            return ast
+        try:
+            return ValueExpression(execute(ast, []))
+        except Exception:
+            # Leave the error to be raised if and when the query runs
+            return ast
     elif isinstance(ast, ArrayExpression):
-        return RuntimeValue.of([execute(item, stack) for item in ast.items])
+        ast.items = [fold_constants(item) for item in ast.items]
+        items = [item.value for item in ast.items if isinstance(item, ValueExpression)]
+        if len(items) == len(ast.items):
+            return ValueExpression(RuntimeValue(RuntimeValueType.Array, items))
     elif isinstance(ast, ObjectExpression):
-        return RuntimeValue.of(
-            {key: execute(value, stack) for key, value in ast.entries.items()}
+        ast = ObjectExpression(
+            {key: fold_constants(value) for key, value in ast.entries.items()}
         )
+        entries = {
+            key: value.value
+            for key, value in ast.entries.items()
+            if isinstance(value, ValueExpression)
+        }
+        if len(entries) == len(ast.entries):
+            return ValueExpression(RuntimeValue(RuntimeValueType.Object, entries))
     elif isinstance(ast, PipeExpression):
-        return execute_pipe(ast.stages, stack)
-    raise NotImplementedError("execute() not implemented for " + str(ast.type))
+        first, *remaining = ast.stages
+        # Later stages have to stay function calls, so only their arguments
+        # are folded.
+        for stage in remaining:
+            if isinstance(stage, FnExpression):
+                stage.args = [fold_constants(arg) for arg in stage.args]
+        ast.stages = [fold_constants(first)] + remaining
+    return ast
+
+
+def prepare(ast: BaseExpression) -> BaseExpression:
+    """
+    Run the rewrites applied to a freshly parsed tree before it's executed
+    """
+    return fold_constants(resolve_builtins(flatten_paths(ast)))
 
 
-def execute_outer(ast: Expression, data: RuntimeValue) -> RuntimeValue:
-    return execute(ast, build_initial_stack(data, builtins))
+def execute_outer(ast: BaseExpression, data: RuntimeValue) -> RuntimeValue:
+    return execute(ast, build_initial_stack(data, _builtin_frame))
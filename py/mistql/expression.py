@@ -1,8 +1,8 @@
 from enum import Enum
-from typing import Dict, List, Union, Any
+from typing import Any, Callable, Dict, List, Optional, Union
 from mistql.runtime_value import RuntimeValue
 
-from typeguard import typechecked
+from mistql.env_flags import typechecked
 
 
 class ExpressionType(Enum):
@@ -18,28 +18,42 @@ class ExpressionType(Enum):
 class BaseExpression:
     """Represents the MistQL expression, after parsing"""
 
+    __slots__ = ("type",)
+
     @typechecked
     def __init__(self, type: ExpressionType):
         self.type = type
 
 
 class FnExpression(BaseExpression):
+    __slots__ = ("fn", "args", "resolved_fn")
+
     @typechecked
     def __init__(self, fn: BaseExpression, args: List[BaseExpression]):
         super().__init__(ExpressionType.Fncall)
         self.fn = fn
         self.args = args
+        # The function definition to call directly, set ahead of execution
+        # when fn is a ref that always resolves to the same builtin.
+        self.resolved_fn: Optional[Callable] = None
 
 
 class RefExpression(BaseExpression):
+    __slots__ = ("name", "absolute", "resolved")
+
     @typechecked
     def __init__(self, name: str, absolute: bool = False):
         super().__init__(ExpressionType.Reference)
         self.name = name
         self.absolute = absolute
+        # Set ahead of execution for refs that always resolve to the same
+        # value, letting execute skip the stack lookup.
+        self.resolved: Optional[RuntimeValue] = None
 
 
 class ValueExpression(BaseExpression):
+    __slots__ = ("value",)
+
     @typechecked
     def __init__(self, value: RuntimeValue):
         super().__init__(ExpressionType.Value)
@@ -51,6 +65,8 @@ class ValueExpression(BaseExpression):
 
 
 class ArrayExpression(BaseExpression):
+    __slots__ = ("items",)
+
     @typechecked
     def __init__(self, items: List[BaseExpression]):
         super().__init__(ExpressionType.Array)
@@ -58,13 +74,21 @@ class ArrayExpression(BaseExpression):
 
 
 class ObjectExpression(BaseExpression):
+    __slots__ = ("entries", "entry_keys", "entry_values")
+
     @typechecked
     def __init__(self, entries: Dict[str, BaseExpression]):
         super().__init__(ExpressionType.Object)
         self.entries = entries
+        # Kept side by side so execution can zip them without going through
+        # the entries dict each time.
+        self.entry_keys = tuple(entries.keys())
+        self.entry_values = tuple(entries.values())
 
 
 class PipeExpression(BaseExpression):
+    __slots__ = ("stages",)
+
     @typechecked
     def __init__(self, stages: List[BaseExpression]):
         super().__init__(ExpressionType.Pipe)
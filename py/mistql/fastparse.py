@@ -0,0 +1,306 @@
+import json
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from mistql.expression import (
+    ArrayExpression,
+    BaseExpression,
+    FnExpression,
+    ObjectExpression,
+    PipeExpression,
+    RefExpression,
+    ValueExpression,
+)
+
+
+class FastParseError(Exception):
+    """
+    Raised when the fast parser can't tell how grammar.lark would parse a
+    query. The query is then handed to the Lark parser, which either parses
+    it or reports the syntax error.
+    """
+
+    pass
+
+
+class Lexeme(NamedTuple):
+    kind: str
+    text: str
+    # Whether whitespace comes right before this lexeme. Function arguments
+    # are separated by whitespace, and indexing must follow without any.
+    spaced: bool
+
+
+# Mirrors the terminals in grammar.lark, longest match first
+lexeme_regex = re.compile(
+    r"""
+    (?P<WS>[\ \t\f\r\n]+)
+    |(?P<STRING>"(?:[^"\\\n]|\\.)*")
+    |(?P<NUMBER>(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+    |(?P<NAME>[_A-Za-z][_A-Za-z0-9]*)
+    |(?P<OP>\|\||&&|==|!=|=~|>=|<=|[<>+\-*/%!|.,:()\[\]{}@$])
+    """,
+    re.VERBOSE,
+)
+
+
+def tokenize(raw: str) -> List[Lexeme]:
+    lexemes: List[Lexeme] = []
+    spaced = False
+    position = 0
+    while position < len(raw):
+        match = lexeme_regex.match(raw, position)
+        if match is None:
+            raise FastParseError(f"Unexpected character at {position}")
+        position = match.end()
+        kind = match.lastgroup or ""
+        if kind == "WS":
+            spaced = True
+            continue
+        lexemes.append(Lexeme(kind, match.group(), spaced))
+        spaced = False
+    lexemes.append(Lexeme("EOF", "", spaced))
+    return lexemes
+
+
+def decode_string(raw: str) -> str:
+    # Most literals have no escapes or control characters, in which case
+    # json.loads would just return what's between the quotes.
+    if "\\" not in raw and raw.isprintable():
+        return raw[1:-1]
+    return json.loads(raw)
+
+
+def decode_string_lexeme(raw: str) -> str:
+    try:
+        return decode_string(raw)
+    except ValueError:
+        raise FastParseError(f"Invalid string literal {raw}")
+
+
+def operator_ref(name: str) -> RefExpression:
+    return RefExpression(name, absolute=True)
+
+
+# Binary operators from loosest to tightest binding
+binary_operator_levels: List[Dict[str, RefExpression]] = [
+    {"||": operator_ref("||")},
+    {"&&": operator_ref("&&")},
+    {"==": operator_ref("=="), "!=": operator_ref("!="), "=~": operator_ref("=~")},
+    {
+        ">": operator_ref(">"),
+        "<": operator_ref("<"),
+        ">=": operator_ref(">="),
+        "<=": operator_ref("<="),
+    },
+    {"+": operator_ref("+"), "-": operator_ref("-")},
+    {"*": operator_ref("*"), "/": operator_ref("/"), "%": operator_ref("%")},
+]
+unary_operators = {"!": operator_ref("!/unary"), "-": operator_ref("-/unary")}
+dot_ref = operator_ref(".")
+index_ref = operator_ref("index")
+at_ref = RefExpression("@")
+dollar_ref = RefExpression("$")
+
+literals = {"true": True, "false": False, "null": None}
+operand_starts = {"(", "[", "{", "!", "-", "@", "$"}
+
+
+class Parser:
+    """
+    Precedence-climbing parser over the rules in grammar.lark, with one method
+    per level of the grammar.
+    """
+
+    def __init__(self, raw: str):
+        self.lexemes = tokenize(raw)
+        self.position = 0
+        # Number of binary minuses with whitespace before them seen so far
+        self.spaced_minuses = 0
+
+    def peek(self, offset: int = 0) -> Lexeme:
+        return self.lexemes[min(self.position + offset, len(self.lexemes) - 1)]
+
+    def advance(self) -> Lexeme:
+        lexeme = self.lexemes[self.position]
+        if lexeme.kind != "EOF":
+            self.position += 1
+        return lexeme
+
+    def at_op(self, text: str) -> bool:
+        lexeme = self.peek()
+        return lexeme.kind == "OP" and lexeme.text == text
+
+    def expect_op(self, text: str):
+        if not self.at_op(text):
+            raise FastParseError(f"Expected {text}, got {self.peek().text}")
+        self.advance()
+
+    def parse(self) -> BaseExpression:
+        expression = self.piped()
+        if self.peek().kind != "EOF":
+            raise FastParseError(f"Unexpected {self.peek().text}")
+        return expression
+
+    def piped(self) -> BaseExpression:
+        first = self.fncall(in_pipe=False)
+        if not self.at_op("|"):
+            return first
+        stages = [first]
+        while self.at_op("|"):
+            self.advance()
+            stages.append(self.fncall(in_pipe=True))
+        return PipeExpression(stages)
+
+    def starts_argument(self, lexeme: Lexeme) -> bool:
+        if not lexeme.spaced:
+            return False
+        if lexeme.kind == "OP":
+            return lexeme.text in operand_starts
+        return lexeme.kind in ("STRING", "NUMBER", "NAME")
+
+    def fncall(self, in_pipe: bool) -> BaseExpression:
+        spaced_minuses = self.spaced_minuses
+        items = [self.binary(0)]
+        while self.starts_argument(self.peek()):
+            items.append(self.binary(0))
+        if (len(items) > 1 or in_pipe) and self.spaced_minuses != spaced_minuses:
+            # Within calls the grammar can also read " - " as an argument
+            # separator followed by a negation, and it does for "a - b c" and
+            # "@ | index - 1", so leave it to decide.
+            raise FastParseError("Ambiguous minus in function call")
+        # Pipe stages are always calls, even without arguments
+        if len(items) == 1 and not in_pipe:
+            return items[0]
+        return FnExpression(items[0], items[1:])
+
+    def binary(self, level: int) -> BaseExpression:
+        if level == len(binary_operator_levels):
+            return self.unary()
+        operators = binary_operator_levels[level]
+        left = self.binary(level + 1)
+        while True:
+            lexeme = self.peek()
+            if lexeme.kind != "OP" or lexeme.text not in operators:
+                return left
+            if lexeme.text == "-" and lexeme.spaced and not self.peek(1).spaced:
+                # "f -x" could be a subtraction or a call with a negated
+                # argument, so leave it to the grammar to decide.
+                raise FastParseError("Ambiguous minus")
+            if lexeme.text == "-" and lexeme.spaced:
+                self.spaced_minuses += 1
+            self.advance()
+            right = self.binary(level + 1)
+            left = FnExpression(operators[lexeme.text], [left, right])
+
+    def unary(self) -> BaseExpression:
+        lexeme = self.peek()
+        if lexeme.kind == "OP" and lexeme.text in unary_operators:
+            self.advance()
+            return FnExpression(unary_operators[lexeme.text], [self.unary()])
+        return self.postfix()
+
+    def postfix(self) -> BaseExpression:
+        base = self.simple()
+        while True:
+            lexeme = self.peek()
+            if lexeme.kind != "OP":
+                return base
+            if lexeme.text == ".":
+                self.advance()
+                base = FnExpression(dot_ref, [base, self.dot_reference()])
+            elif lexeme.text == "[" and not lexeme.spaced:
+                self.advance()
+                base = FnExpression(index_ref, self.index_innards() + [base])
+            else:
+                return base
+
+    def dot_reference(self) -> BaseExpression:
+        lexeme = self.advance()
+        if lexeme.kind == "NAME" and lexeme.text not in literals:
+            return RefExpression(lexeme.text)
+        if lexeme.kind == "OP" and lexeme.text == "@":
+            return at_ref
+        if lexeme.kind == "OP" and lexeme.text == "$":
+            return dollar_ref
+        raise FastParseError(f"Unexpected {lexeme.text} after dot")
+
+    def index_innards(self) -> List[BaseExpression]:
+        # Colons split the innards into segments holding at most one
+        # expression each, and a segment left empty is passed as null.
+        segments: List[Optional[BaseExpression]] = [None]
+        while not self.at_op("]"):
+            if self.at_op(":"):
+                self.advance()
+                segments.append(None)
+            elif segments[-1] is None:
+                segments[-1] = self.piped()
+            else:
+                raise FastParseError(f"Unexpected {self.peek().text} in index")
+        self.advance()
+        return [
+            ValueExpression.of(None) if segment is None else segment
+            for segment in segments
+        ]
+
+    def simple(self) -> BaseExpression:
+        lexeme = self.advance()
+        if lexeme.kind == "NUMBER":
+            return ValueExpression.of(float(lexeme.text))
+        elif lexeme.kind == "STRING":
+            return ValueExpression.of(decode_string_lexeme(lexeme.text))
+        elif lexeme.kind == "NAME":
+            if lexeme.text in literals:
+                return ValueExpression.of(literals[lexeme.text])
+            return RefExpression(lexeme.text)
+        elif lexeme.kind == "OP":
+            if lexeme.text == "@":
+                return at_ref
+            elif lexeme.text == "$":
+                return dollar_ref
+            elif lexeme.text == "(":
+                expression = self.piped()
+                self.expect_op(")")
+                return expression
+            elif lexeme.text == "[":
+                return self.array()
+            elif lexeme.text == "{":
+                return self.object()
+        raise FastParseError(f"Unexpected {lexeme.text or 'end of query'}")
+
+    def array(self) -> BaseExpression:
+        items: List[BaseExpression] = []
+        if not self.at_op("]"):
+            items.append(self.piped())
+            while self.at_op(","):
+                self.advance()
+                items.append(self.piped())
+        self.expect_op("]")
+        return ArrayExpression(items)
+
+    def object(self) -> BaseExpression:
+        entries: Dict[str, BaseExpression] = {}
+        if not self.at_op("}"):
+            while True:
+                lexeme = self.advance()
+                if lexeme.kind == "STRING":
+                    key = decode_string_lexeme(lexeme.text)
+                elif lexeme.kind == "NAME" and lexeme.text not in literals:
+                    key = lexeme.text
+                else:
+                    raise FastParseError(f"Unexpected object key {lexeme.text}")
+                self.expect_op(":")
+                entries[key] = self.piped()
+                if not self.at_op(","):
+                    break
+                self.advance()
+        self.expect_op("}")
+        return ObjectExpression(entries)
+
+
+def parse(raw: str) -> BaseExpression:
+    """
+    Parse a query without going through Lark. Raises FastParseError for
+    anything it doesn't handle.
+    """
+    return Parser(raw).parse()
@@ -7,10 +7,10 @@ from mistql.expression import (
     ObjectExpression,
     PipeExpression,
 )
-from typing import Union, List, Any
-import json
+from typing import Callable, Dict, Optional, Union, List, Any
 
 from mistql.expression import BaseExpression
+from mistql.fastparse import FastParseError, decode_string, parse as fast_parse
 from mistql.exceptions import OpenAnIssueIfYouGetThisError
 
 
@@ -36,93 +36,124 @@ function_mappings = {
     "or": "||",
 }
 
+# Refs hold nothing specific to where they appear in a query, so the common
+# ones are shared between occurrences instead of allocated for each.
+operator_refs = {
+    key: RefExpression(name, absolute=True) for key, name in function_mappings.items()
+}
+index_ref = RefExpression("index", absolute=True)
+at_ref = RefExpression("@")
+dollar_ref = RefExpression("$")
 
-def process_lark_tree(lark_node: Tree) -> BaseExpression:
-    if lark_node.data == "array":
-        return ArrayExpression([from_lark(child) for child in lark_node.children])
-    elif lark_node.data == "object":
-        obj = {}
-        for child in lark_node.children:
-            if isinstance(child, str):
-                raise OpenAnIssueIfYouGetThisError(
-                    "Got string for child when we didn't expect it."
-                )
-            key = from_lark(child.children[0])
-            if isinstance(key, ValueExpression):
-                key = key.value.value
-            elif isinstance(key, RefExpression):
-                key = key.name
-            else:
-                raise OpenAnIssueIfYouGetThisError(f"Unknown key type {type(key)}")
-            value = from_lark(child.children[1])
-            obj[key] = value
-        return ObjectExpression(obj)
-    elif lark_node.data == "pipe":
-        return PipeExpression([from_lark(child) for child in lark_node.children])
-    elif lark_node.data == "fncall":
-        return FnExpression(
-            from_lark(lark_node.children[0]),
-            [from_lark(child) for child in lark_node.children[1:]],
-        )
-    elif lark_node.data in function_mappings:
-        return FnExpression(
-            RefExpression(function_mappings[lark_node.data], absolute=True),
-            [from_lark(child) for child in lark_node.children[:]],
-        )
-    elif lark_node.data == "index":
-        # This is gross becase i can't figure out how to get the tree to look
-        # a little more sensible.
-        base, indexing = lark_node.children
-        if isinstance(indexing, str):
-            raise OpenAnIssueIfYouGetThisError(
-                "Got string for child when we didn't expect it."
-            )
-        innards = indexing.children[0]
-        if isinstance(innards, str):
+
+def process_array(lark_node: Tree) -> BaseExpression:
+    return ArrayExpression([from_lark(child) for child in lark_node.children])
+
+
+def process_object(lark_node: Tree) -> BaseExpression:
+    obj = {}
+    for child in lark_node.children:
+        if isinstance(child, str):
             raise OpenAnIssueIfYouGetThisError(
                 "Got string for child when we didn't expect it."
             )
-        fnexp_args: List[BaseExpression] = []
-        prev_was_token = True
-        for child in innards.children:
-            if isinstance(child, Token) and child.value == ":":
-                if prev_was_token:
-                    fnexp_args.append(ValueExpression.of(None))
-                prev_was_token = True
-                continue
-            else:
-                fnexp_args.append(from_lark(child))
-                prev_was_token = False
-        if prev_was_token:
-            fnexp_args.append(ValueExpression.of(None))
-        fnexp_args.append(from_lark(base))
-        return FnExpression(RefExpression("index", absolute=True), fnexp_args)
-    else:
+        key = from_lark(child.children[0])
+        if isinstance(key, ValueExpression):
+            key = key.value.value
+        elif isinstance(key, RefExpression):
+            key = key.name
+        else:
+            raise OpenAnIssueIfYouGetThisError(f"Unknown key type {type(key)}")
+        value = from_lark(child.children[1])
+        obj[key] = value
+    return ObjectExpression(obj)
+
+
+def process_pipe(lark_node: Tree) -> BaseExpression:
+    return PipeExpression([from_lark(child) for child in lark_node.children])
+
+
+def process_fncall(lark_node: Tree) -> BaseExpression:
+    return FnExpression(
+        from_lark(lark_node.children[0]),
+        [from_lark(child) for child in lark_node.children[1:]],
+    )
+
+
+def process_operator(lark_node: Tree) -> BaseExpression:
+    return FnExpression(
+        operator_refs[lark_node.data],
+        [from_lark(child) for child in lark_node.children[:]],
+    )
+
+
+def process_index(lark_node: Tree) -> BaseExpression:
+    # This is gross becase i can't figure out how to get the tree to look
+    # a little more sensible.
+    base, indexing = lark_node.children
+    if isinstance(indexing, str):
+        raise OpenAnIssueIfYouGetThisError(
+            "Got string for child when we didn't expect it."
+        )
+    innards = indexing.children[0]
+    if isinstance(innards, str):
+        raise OpenAnIssueIfYouGetThisError(
+            "Got string for child when we didn't expect it."
+        )
+    # Colons split the innards into segments holding at most one expression
+    # each, and a segment left empty is passed as null.
+    segments: List[Optional[BaseExpression]] = [None]
+    for child in innards.children:
+        # Colons may come with whitespace around them
+        if isinstance(child, Token) and child.type == "WCOLON":
+            segments.append(None)
+        else:
+            segments[-1] = from_lark(child)
+    fnexp_args = [
+        ValueExpression.of(None) if segment is None else segment
+        for segment in segments
+    ]
+    fnexp_args.append(from_lark(base))
+    return FnExpression(index_ref, fnexp_args)
+
+
+# One lookup per node instead of comparing against each rule name in turn
+tree_processors: Dict[str, Callable[[Tree], BaseExpression]] = {
+    "array": process_array,
+    "object": process_object,
+    "pipe": process_pipe,
+    "fncall": process_fncall,
+    "index": process_index,
+    **{rule: process_operator for rule in function_mappings},
+}
+
+
+def process_lark_tree(lark_node: Tree) -> BaseExpression:
+    processor = tree_processors.get(lark_node.data)
+    if processor is None:
         raise OpenAnIssueIfYouGetThisError(
             f"Unknown lark expression type: {lark_node.data}"
         )
+    return processor(lark_node)
+
+
+token_processors: Dict[str, Callable[[Token], BaseExpression]] = {
+    "NUMBER": lambda token: ValueExpression.of(float(token.value)),
+    "ESCAPED_STRING": lambda token: ValueExpression.of(decode_string(token.value)),
+    "TRUE": lambda token: ValueExpression.of(True),
+    "FALSE": lambda token: ValueExpression.of(False),
+    "NULL": lambda token: ValueExpression.of(None),
+    "CNAME": lambda token: RefExpression(token.value),
+    "AT": lambda token: at_ref,
+    "DOLLAR": lambda token: dollar_ref,
+}
 
 
 def process_lark_token(lark_node: Token) -> BaseExpression:
-    if lark_node.type == "NUMBER":
-        return ValueExpression.of(float(lark_node.value))
-    elif lark_node.type == "ESCAPED_STRING":
-        value = json.loads(lark_node.value)
-        return ValueExpression.of(value)
-    elif lark_node.type == "TRUE":
-        return ValueExpression.of(True)
-    elif lark_node.type == "FALSE":
-        return ValueExpression.of(False)
-    elif lark_node.type == "NULL":
-        return ValueExpression.of(None)
-    elif lark_node.type == "CNAME":
-        return RefExpression(lark_node.value)
-    elif lark_node.type == "AT":
-        return RefExpression("@")
-    elif lark_node.type == "DOLLAR":
-        return RefExpression("$")
-    else:
+    processor = token_processors.get(lark_node.type)
+    if processor is None:
         raise OpenAnIssueIfYouGetThisError(f"Unknown token type {lark_node.type}")
+    return processor(lark_node)
 
 
 def from_lark(lark_node: Union[Any, str, Tree, Token]):
@@ -135,6 +166,12 @@ def from_lark(lark_node: Union[Any, str, Tree, Token]):
 
 
 def parse(raw):
+    # Most queries are handled by the hand-written parser, which is much
+    # cheaper than Earley. Anything it can't vouch for goes through Lark.
+    try:
+        return fast_parse(raw)
+    except FastParseError:
+        pass
     # TODO: Translate errors from this function to something that inherits
     # from MistQLException
     parsed = mistql_parser.parse(raw)
@@ -1,10 +1,19 @@
+from functools import lru_cache
 from typing import Any
 
-from .execute import execute_outer
+from .execute import execute_outer, prepare
+from .expression import BaseExpression
 from .gardenwall import input_garden_wall, output_garden_wall
 from .parse import parse
 
 
+@lru_cache(maxsize=1024)
+def _prepare(query: str) -> BaseExpression:
+    # Parsing dominates the cost of small queries, and nothing modifies the
+    # tree while executing it, so prepared trees are shared between calls.
+    return prepare(parse(query))
+
+
 def query(query: str, raw_data: Any) -> Any:
     """
     Executes a query on a given data.
@@ -13,7 +22,7 @@ def query(query: str, raw_data: Any) -> Any:
     :param data: The data to query.
     :return: The result of the query.
     """
-    ast = parse(query)
+    ast = _prepare(query)
     data = input_garden_wall(raw_data)
     result = execute_outer(ast, data)
     return_value = output_garden_wall(result)
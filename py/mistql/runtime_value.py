@@ -1,26 +1,44 @@
 import json
-import re
 from datetime import date, datetime, time
-from enum import Enum
 from math import isfinite, isnan
-from typing import Any, Callable, Dict, Set, Union
+from typing import AbstractSet, Any, Callable, ClassVar, Dict, List, Optional, Union
 
 from mistql.exceptions import MistQLTypeError, OpenAnIssueIfYouGetThisError
 
 
-class RuntimeValueType(Enum):
+class RuntimeValueType:
     """
-    Enumeration of the different types of runtime values available in MistQL
+    Enumeration of the different types of runtime values available in MistQL.
+    Types are plain ints, so type checks on hot paths are int comparisons.
     """
 
-    Null = "null"
-    Boolean = "boolean"
-    Number = "number"
-    String = "string"
-    Object = "object"
-    Array = "array"
-    Function = "function"
-    Regex = "regex"
+    Null = 0
+    Boolean = 1
+    Number = 2
+    String = 3
+    Object = 4
+    Array = 5
+    Function = 6
+    Regex = 7
+
+
+_TYPE_NAMES = (
+    "null",
+    "boolean",
+    "number",
+    "string",
+    "object",
+    "array",
+    "function",
+    "regex",
+)
+
+
+def type_name(value_type: int) -> str:
+    """
+    Get the MistQL name of a RuntimeValueType, for use in messages
+    """
+    return _TYPE_NAMES[value_type]
 
 
 # String formatting algorithm
@@ -30,55 +48,60 @@ LOWER_NUM_FORMATTING_BREAKPOINT = 1e-7
 MAX_SAFE_INT = 2 ** 53 - 1
 
 
-e_zero_regex = re.compile(r"e-0+")
-
-
 def format_number(value: float) -> str:
-    if value < UPPER_NUM_FORMATTING_BREAKPOINT and value >= MAX_SAFE_INT:
+    if value < UPPER_NUM_FORMATTING_BREAKPOINT and (
+        value >= MAX_SAFE_INT or value.is_integer()
+    ):
         return str(int(value))
-    elif value < UPPER_NUM_FORMATTING_BREAKPOINT and value == int(value):
-        return str(int(value))
-    elif value < 1 and value <= LOWER_NUM_FORMATTING_BREAKPOINT:
-        formatted = str(value)
-        return e_zero_regex.sub("e-", formatted)
+    if value < 1 and value <= LOWER_NUM_FORMATTING_BREAKPOINT:
+        # Python pads negative exponents to two digits, so there's at most one
+        # leading zero to drop (1e-08 -> 1e-8)
+        return str(value).replace("e-0", "e-")
     elif value < 1:
         formatted = "{:.16f}".format(value)
         formatted = formatted.rstrip("0")
         return str(formatted)
     else:
-        return json.dumps(value)
+        # Same as json.dumps for finite floats, without the trip through json
+        return repr(value)
 
 
 class RuntimeValue:
+    # Queries build a RuntimeValue for every item of their input, so instances
+    # carry no __dict__. Only regexes have modifiers, and the rest leave it None.
+    __slots__ = ("type", "value", "modifiers")
+
+    # Shared instances of the constant values, set once the class exists
+    NULL: ClassVar["RuntimeValue"]
+    TRUE: ClassVar["RuntimeValue"]
+    FALSE: ClassVar["RuntimeValue"]
+
     @staticmethod
     def of(value):
         """
         Convert a Python value into a MistQL RuntimeValue
         """
+        # Exact types are looked up directly. Subclasses fall through to the
+        # isinstance checks below.
+        converter = _CONVERTERS.get(type(value))
+        if converter is not None:
+            return converter(value)
         if isinstance(value, RuntimeValue):
             return value
         elif value is None:
-            return RuntimeValue(RuntimeValueType.Null)
+            return _NULL
         elif isinstance(value, bool):
-            return RuntimeValue(RuntimeValueType.Boolean, value)
+            return _of_bool(value)
         elif isinstance(value, int):
-            return RuntimeValue(RuntimeValueType.Number, float(value))
+            return _of_int(value)
         elif isinstance(value, float):
-            if isnan(value) or not isfinite(value):
-                return RuntimeValue(RuntimeValueType.Null)
-            return RuntimeValue(RuntimeValueType.Number, value)
+            return _of_float(value)
         elif isinstance(value, str):
-            return RuntimeValue(RuntimeValueType.String, value)
+            return _of_str(value)
         elif isinstance(value, list) or isinstance(value, tuple):
-            return RuntimeValue(
-                RuntimeValueType.Array,
-                [RuntimeValue.of(item) for item in value],
-            )
+            return _of_sequence(value)
         elif isinstance(value, dict):
-            return RuntimeValue(
-                RuntimeValueType.Object,
-                {key: RuntimeValue.of(value[key]) for key in value},
-            )
+            return _of_dict(value)
         elif (isinstance(value, date) or
                 isinstance(value, datetime) or
                 isinstance(value, time)):
@@ -100,43 +123,12 @@ class RuntimeValue:
 
     @staticmethod
     def eq(a, b):
+        if a is b:
+            # Shared values such as null and booleans are always identical
+            return True
         if a.type != b.type:
             return False
-        if a.type == RuntimeValueType.Null:
-            return True
-        elif a.type == RuntimeValueType.Boolean:
-            return a.value == b.value
-        elif a.type == RuntimeValueType.Number:
-            return a.value == b.value
-        elif a.type == RuntimeValueType.String:
-            return a.value == b.value
-        elif a.type == RuntimeValueType.Array:
-            if len(a.value) != len(b.value):
-                return False
-            for i in range(len(a.value)):
-                if not RuntimeValue.eq(a.value[i], b.value[i]):
-                    return False
-            return True
-        elif a.type == RuntimeValueType.Object:
-            if len(a.value) != len(b.value):
-                return False
-            for key, value in a.value.items():
-                if key not in b.value:
-                    return False
-                if not RuntimeValue.eq(value, b.value[key]):
-                    return False
-            return True
-        elif a.type == RuntimeValueType.Regex:
-            return (
-                a.value.pattern == b.value.pattern
-                and a.value.flags == b.value.flags
-                and a.modifiers == b.modifiers  # due to py not having global flag
-            )
-        elif a.type == RuntimeValueType.Function:
-            # referential equality
-            return a.value == b.value
-        else:
-            raise ValueError("Equality not yet implemented: " + str(a.type))
+        return _EQ_HANDLERS[a.type](a, b)
 
     @staticmethod
     def compare(a, b) -> int:
@@ -146,7 +138,9 @@ class RuntimeValue:
         if a.type != b.type:
             raise ValueError("Cannot compare MistQL values of different types")
         elif not a.comparable():
-            raise ValueError("Cannot compare MistQL values of type " + str(a.type))
+            raise ValueError(
+                "Cannot compare MistQL values of type " + type_name(a.type)
+            )
         elif a.type == RuntimeValueType.Boolean:
             return int(a.value) - int(b.value)
         elif a.type == RuntimeValueType.Number:
@@ -155,104 +149,106 @@ class RuntimeValue:
             return (a.value > b.value) - (a.value < b.value)
         else:
             raise OpenAnIssueIfYouGetThisError(
-                "Cannot compare MistQL values of type " + str(a.type))
+                "Cannot compare MistQL values of type " + type_name(a.type))
 
     def comparable(self) -> bool:
         """
         Check if the value is comparable
         """
-        return self.type in (
-            RuntimeValueType.Boolean,
-            RuntimeValueType.Number,
-            RuntimeValueType.String,
-        )
+        return self.type in _COMPARABLE_TYPES
 
+    # Comparable values of a single type order the same way as their
+    # underlying python values, so the operators compare those directly.
     def __lt__(self, __o: object):
         if not isinstance(__o, RuntimeValue):
             raise ValueError("Cannot compare MistQL value to non-MistQL value")
-        return RuntimeValue.of(self.compare(self, __o) < 0)
+        if self.type == __o.type and self.type in _COMPARABLE_TYPES:
+            return _TRUE if self.value < __o.value else _FALSE
+        return _TRUE if self.compare(self, __o) < 0 else _FALSE
 
     def __le__(self, __o: object):
         if not isinstance(__o, RuntimeValue):
             raise ValueError("Cannot compare MistQL value to non-MistQL value")
-        return RuntimeValue.of(self.compare(self, __o) <= 0)
+        if self.type == __o.type and self.type in _COMPARABLE_TYPES:
+            return _TRUE if self.value <= __o.value else _FALSE
+        return _TRUE if self.compare(self, __o) <= 0 else _FALSE
 
     def __gt__(self, __o: object):
         if not isinstance(__o, RuntimeValue):
             raise ValueError("Cannot compare MistQL value to non-MistQL value")
-        return RuntimeValue.of(self.compare(self, __o) > 0)
+        if self.type == __o.type and self.type in _COMPARABLE_TYPES:
+            return _TRUE if self.value > __o.value else _FALSE
+        return _TRUE if self.compare(self, __o) > 0 else _FALSE
 
     def __ge__(self, __o: object):
         if not isinstance(__o, RuntimeValue):
             raise ValueError("Cannot compare MistQL value to non-MistQL value")
-        return RuntimeValue.of(self.compare(self, __o) >= 0)
+        if self.type == __o.type and self.type in _COMPARABLE_TYPES:
+            return _TRUE if self.value >= __o.value else _FALSE
+        return _TRUE if self.compare(self, __o) >= 0 else _FALSE
 
     def __eq__(self, __o: object):
         if not isinstance(__o, RuntimeValue):
             raise ValueError("Cannot compare MistQL value to non-MistQL value")
-        return RuntimeValue.of(RuntimeValue.eq(self, __o))
+        return _TRUE if RuntimeValue.eq(self, __o) else _FALSE
 
     def __ne__(self, __o: object):
         if not isinstance(__o, RuntimeValue):
             raise ValueError("Cannot compare MistQL value to non-MistQL value")
-        return RuntimeValue.of(not RuntimeValue.eq(self, __o))
+        return _FALSE if RuntimeValue.eq(self, __o) else _TRUE
 
     def __bool__(self):
-        return self.truthy()
+        # Same as truthy(), without the extra method call
+        return _TRUTHY_HANDLERS[self.type](self)
 
-    def __init__(self, type, value=None, modifiers=None):
+    def __init__(self, type: int, value=None, modifiers=None):
         self.type = type
         self.value = value
-        self.modifiers: Dict[str, Any] = modifiers if modifiers else {}
+        self.modifiers: Optional[Dict[str, Any]] = modifiers or None
 
     def to_python(self):
         """
         Convert a MistQL RuntimeValue into a Python value
         """
-        if self.type == RuntimeValueType.Null:
-            return None
-        elif self.type == RuntimeValueType.Boolean:
-            return self.value
-        elif self.type == RuntimeValueType.Number:
-            return self.value
-        elif self.type == RuntimeValueType.String:
+        if self.type in _PYTHON_SCALAR_TYPES:
             return self.value
+        elif self.type == RuntimeValueType.Null:
+            return None
         elif self.type == RuntimeValueType.Array:
-            return [item.to_python() for item in self.value]
+            # Scalar items are unwrapped inline rather than with a method call
+            # per item
+            return [
+                item.value if item.type in _PYTHON_SCALAR_TYPES else item.to_python()
+                for item in self.value
+            ]
         elif self.type == RuntimeValueType.Object:
-            return {key: value.to_python() for key, value in self.value.items()}
+            return {
+                key: (
+                    value.value
+                    if value.type in _PYTHON_SCALAR_TYPES
+                    else value.to_python()
+                )
+                for key, value in self.value.items()
+            }
         else:
             raise ValueError(
-                "Cannot convert MistQL value type to Python: " + str(self.type)
+                "Cannot convert MistQL value type to Python: " + type_name(self.type)
             )
 
     def truthy(self) -> bool:
         """
         Return whether this value is truthy
         """
-        if self.type == RuntimeValueType.Null:
-            return False
-        elif self.type == RuntimeValueType.Boolean:
-            return self.value
-        elif self.type == RuntimeValueType.Number:
-            return bool(self.value)
-        elif self.type == RuntimeValueType.String:
-            return self.value != ""
-        elif self.type == RuntimeValueType.Array:
-            return len(self.value) > 0
-        elif self.type == RuntimeValueType.Object:
-            return len(self.value) > 0
-        elif self.type == RuntimeValueType.Function:
-            return True
-        elif self.type == RuntimeValueType.Regex:
-            return True
-        else:
-            raise ValueError("Truthiness not yet implemented: " + str(self.type))
+        return _TRUTHY_HANDLERS[self.type](self)
 
     def to_json(self, permissive=False) -> str:
         """
         Convert this value to JSON string
         """
+        if not permissive:
+            # Serialize in one pass of the json module's encoder rather than
+            # joining strings for every nested value.
+            return json.dumps(self._to_jsonable(), separators=(",", ":"))
         if self.type == RuntimeValueType.Null:
             return "null"
         elif self.type == RuntimeValueType.Boolean:
@@ -286,7 +282,22 @@ class RuntimeValue:
                 return "[regex]"
             else:
                 return "[unknown]"
-        raise ValueError("Cannot convert MistQL value to JSON: " + str(self.type))
+        raise ValueError("Cannot convert MistQL value to JSON: " + type_name(self.type))
+
+    def _to_jsonable(self):
+        """
+        Convert this value to the Python value json.dumps should write for it
+        """
+        if self.type == RuntimeValueType.Number:
+            num = self.value
+            return int(num) if num == int(num) else num
+        elif self.type == RuntimeValueType.Array:
+            return [item._to_jsonable() for item in self.value]
+        elif self.type == RuntimeValueType.Object:
+            return {key: item._to_jsonable() for key, item in self.value.items()}
+        elif self.type in _JSON_SCALAR_TYPES:
+            return self.value
+        raise ValueError("Cannot convert MistQL value to JSON: " + type_name(self.type))
 
     def to_string(self) -> str:
         """
@@ -310,7 +321,7 @@ class RuntimeValue:
             return float(0)
         else:
             raise MistQLTypeError(
-                "Cannot convert MistQL value to float: " + str(self.type)
+                "Cannot convert MistQL value to float: " + type_name(self.type)
             )
 
     def __repr__(self) -> str:
@@ -330,16 +341,188 @@ class RuntimeValue:
         if self.type == RuntimeValueType.Object and string in self.value:
             return self.value[string]
         else:
-            return RuntimeValue(RuntimeValueType.Null)
+            return _NULL
 
 
-def assert_type(
-    value: RuntimeValue, expected_type: Union[Set[RuntimeValueType], RuntimeValueType]
-):
-    if isinstance(expected_type, Set):
-        if value.type not in expected_type:
-            raise MistQLTypeError(f"Expected one of {expected_type}, got {value.type}")
-    else:
+def _by_type(handlers: Dict[int, Callable]) -> tuple:
+    """
+    Lay out a handler for every RuntimeValueType in a tuple indexed by type
+    """
+    return tuple(handlers[value_type] for value_type in range(len(_TYPE_NAMES)))
+
+
+def _value_eq(a: RuntimeValue, b: RuntimeValue) -> bool:
+    # For functions, this is referential equality
+    return a.value == b.value
+
+
+def _array_eq(a: RuntimeValue, b: RuntimeValue) -> bool:
+    # map and all keep the walk over the items out of Python bytecode
+    return len(a.value) == len(b.value) and all(
+        map(RuntimeValue.eq, a.value, b.value)
+    )
+
+
+def _object_eq(a: RuntimeValue, b: RuntimeValue) -> bool:
+    if len(a.value) != len(b.value):
+        return False
+    # With equal sizes, finding every key of a in b means the key sets match,
+    # and a single get hashes each key once.
+    get = b.value.get
+    for key, value in a.value.items():
+        other = get(key, _MISSING)
+        if other is _MISSING or not RuntimeValue.eq(value, other):
+            return False
+    return True
+
+
+def _regex_eq(a: RuntimeValue, b: RuntimeValue) -> bool:
+    return (
+        a.value.pattern == b.value.pattern
+        and a.value.flags == b.value.flags
+        and a.modifiers == b.modifiers  # due to py not having global flag
+    )
+
+
+# Equality and truthiness are checked on nearly every operation, so they index
+# straight into a handler by type instead of testing the type against each
+# case in turn.
+_EQ_HANDLERS = _by_type(
+    {
+        RuntimeValueType.Null: lambda a, b: True,
+        RuntimeValueType.Boolean: _value_eq,
+        RuntimeValueType.Number: _value_eq,
+        RuntimeValueType.String: _value_eq,
+        RuntimeValueType.Object: _object_eq,
+        RuntimeValueType.Array: _array_eq,
+        RuntimeValueType.Function: _value_eq,
+        RuntimeValueType.Regex: _regex_eq,
+    }
+)
+
+_TRUTHY_HANDLERS = _by_type(
+    {
+        RuntimeValueType.Null: lambda value: False,
+        RuntimeValueType.Boolean: lambda value: value.value,
+        RuntimeValueType.Number: lambda value: bool(value.value),
+        RuntimeValueType.String: lambda value: value.value != "",
+        RuntimeValueType.Object: lambda value: len(value.value) > 0,
+        RuntimeValueType.Array: lambda value: len(value.value) > 0,
+        RuntimeValueType.Function: lambda value: True,
+        RuntimeValueType.Regex: lambda value: True,
+    }
+)
+
+_MISSING = object()
+
+_COMPARABLE_TYPES = frozenset(
+    (RuntimeValueType.Boolean, RuntimeValueType.Number, RuntimeValueType.String)
+)
+
+# Types whose value is already the Python value they convert to
+_PYTHON_SCALAR_TYPES = (
+    RuntimeValueType.Number,
+    RuntimeValueType.String,
+    RuntimeValueType.Boolean,
+)
+
+_JSON_SCALAR_TYPES = (
+    RuntimeValueType.Null,
+    RuntimeValueType.Boolean,
+    RuntimeValueType.String,
+)
+
+# RuntimeValues are never mutated after construction, so the most common
+# scalars can be shared rather than allocated on every RuntimeValue.of call.
+_NULL = RuntimeValue(RuntimeValueType.Null)
+_TRUE = RuntimeValue(RuntimeValueType.Boolean, True)
+_FALSE = RuntimeValue(RuntimeValueType.Boolean, False)
+RuntimeValue.NULL = _NULL
+RuntimeValue.TRUE = _TRUE
+RuntimeValue.FALSE = _FALSE
+_EMPTY_STRING = RuntimeValue(RuntimeValueType.String, "")
+_SMALL_INTS = {
+    i: RuntimeValue(RuntimeValueType.Number, float(i)) for i in range(-5, 257)
+}
+
+
+def _of_bool(value: bool) -> RuntimeValue:
+    return _TRUE if value else _FALSE
+
+
+def _of_int(value: int) -> RuntimeValue:
+    cached = _SMALL_INTS.get(value)
+    if cached is not None:
+        return cached
+    return RuntimeValue(RuntimeValueType.Number, float(value))
+
+
+def _of_float(value: float) -> RuntimeValue:
+    if isnan(value) or not isfinite(value):
+        return _NULL
+    return RuntimeValue(RuntimeValueType.Number, value)
+
+
+def _of_str(value: str) -> RuntimeValue:
+    if not value:
+        return _EMPTY_STRING
+    return RuntimeValue(RuntimeValueType.String, value)
+
+
+def _of_sequence(value) -> RuntimeValue:
+    if len(value) >= _HOMOGENEOUS_MIN_LENGTH:
+        # Long arrays of a single scalar type are common in input data, and
+        # can be converted without a converter lookup per item.
+        item_type = type(value[0])
+        builder = _HOMOGENEOUS_BUILDERS.get(item_type)
+        if builder is not None and all(type(item) is item_type for item in value):
+            return RuntimeValue(RuntimeValueType.Array, builder(value))
+    return RuntimeValue(
+        RuntimeValueType.Array, [RuntimeValue.of(item) for item in value]
+    )
+
+
+def _of_dict(value: dict) -> RuntimeValue:
+    return RuntimeValue(
+        RuntimeValueType.Object,
+        {key: RuntimeValue.of(item) for key, item in value.items()},
+    )
+
+
+# Below this, checking the item types costs more than it saves
+_HOMOGENEOUS_MIN_LENGTH = 16
+
+_HOMOGENEOUS_BUILDERS: Dict[type, Callable[[Any], List[RuntimeValue]]] = {
+    float: lambda items: [
+        RuntimeValue(RuntimeValueType.Number, item) if isfinite(item) else _NULL
+        for item in items
+    ],
+    int: lambda items: [_of_int(item) for item in items],
+    str: lambda items: [RuntimeValue(RuntimeValueType.String, item) for item in items],
+}
+
+_CONVERTERS: Dict[type, Callable[[Any], RuntimeValue]] = {
+    RuntimeValue: lambda value: value,
+    type(None): lambda value: _NULL,
+    bool: _of_bool,
+    int: _of_int,
+    float: _of_float,
+    str: _of_str,
+    list: _of_sequence,
+    tuple: _of_sequence,
+    dict: _of_dict,
+}
+
+
+def assert_type(value: RuntimeValue, expected_type: Union[AbstractSet[int], int]):
+    if isinstance(expected_type, int):
         if value.type != expected_type:
-            raise MistQLTypeError(f"Expected {expected_type}, got {value.type}")
+            raise MistQLTypeError(
+                f"Expected {type_name(expected_type)}, got {type_name(value.type)}"
+            )
+    elif value.type not in expected_type:
+        expected = ", ".join(sorted(map(type_name, expected_type)))
+        raise MistQLTypeError(
+            f"Expected one of {expected}, got {type_name(value.type)}"
+        )
     return value
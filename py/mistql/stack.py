@@ -1,24 +1,51 @@
 from typing import Callable, List, Dict
 from mistql.runtime_value import RuntimeValue, RuntimeValueType
 from mistql.exceptions import MistQLReferenceError
-from typeguard import typechecked
+from mistql.env_flags import typechecked
 
 StackFrame = Dict[str, RuntimeValue]
 Stack = List[StackFrame]
 
 
 def add_runtime_value_to_stack(value: RuntimeValue, stack: Stack):
+    # Callers may keep using the stack they passed in, so this one gets a new
+    # list. Only the frame is added; the frames below it are shared.
     new_stackframe = {"@": value}
-    for key in value.keys():
-        new_stackframe[key] = value.access(key)
-    new_stack = stack.copy()
-    new_stack.append(new_stackframe)
-    return new_stack
+    if value.type == RuntimeValueType.Object:
+        new_stackframe.update(value.value)
+    return stack + [new_stackframe]
 
 
-def build_initial_stack(data: RuntimeValue, builtins: Dict[str, Callable]) -> Stack:
+def frame_pusher(stack: Stack) -> Callable[[RuntimeValue], Stack]:
+    """
+    Return a function that pushes values onto the stack like
+    add_runtime_value_to_stack, but reuses a single frame between calls. The
+    returned stack is only valid until the next call, which suits builtins
+    that evaluate an expression once per item.
+    """
+    frame: StackFrame = {}
+    new_stack = stack + [frame]
+
+    def push(value: RuntimeValue) -> Stack:
+        frame.clear()
+        frame["@"] = value
+        if value.type == RuntimeValueType.Object:
+            frame.update(value.value)
+        return new_stack
+
+    return push
+
+
+def build_builtin_frame(builtins: Dict[str, Callable]) -> StackFrame:
+    return {name: RuntimeValue.create_function(builtins[name]) for name in builtins}
+
+
+def build_initial_stack(data: RuntimeValue, builtin_frame: StackFrame) -> Stack:
+    # Stack frames are never mutated, so the builtin frame can be shared
+    # between queries rather than rebuilt for each one.
     dollar_var = {
         "@": data,
+        **builtin_frame,
     }
     top_stack_entry = {
         "@": data,
@@ -26,21 +53,16 @@ def build_initial_stack(data: RuntimeValue, builtins: Dict[str, Callable]) -> St
     if data.type == RuntimeValueType.Object:
         for key, value in data.value.items():
             top_stack_entry[key] = value
-    for builtin in builtins:
-        fn = RuntimeValue.create_function(builtins[builtin])
-        dollar_var[builtin] = fn
     top_stack_entry["$"] = RuntimeValue.of(dollar_var)
-    builtin_stackframe = {
-        name: RuntimeValue.create_function(builtins[name]) for name in builtins
-    }
-    return [builtin_stackframe, top_stack_entry]
+    return [builtin_frame, top_stack_entry]
 
 
 @typechecked
 def find_in_stack(stack: Stack, name: str, absolute: bool) -> RuntimeValue:
-    if absolute:
-        stack = stack[:1]
-    for frame in reversed(stack):
-        if name in frame:
-            return frame[name]
+    # Frames only ever hold RuntimeValues, so a single get stands in for a
+    # membership test followed by a lookup.
+    for frame in stack[:1] if absolute else reversed(stack):
+        value = frame.get(name)
+        if value is not None:
+            return value
     raise MistQLReferenceError(f"Could not find {name} in stack")
@@ -1,5 +1,6 @@
+import math
 import tempfile
-from mistql.cli import main
+from mistql.cli import _load_json, main
 
 
 nice_string = '{"hello": "there"}'
@@ -44,3 +45,21 @@ def test_encoding_utf32():
 
 def test_encoding_ascii():
     enc_helper("ascii", nice_string)
+
+
+def test_input_only_the_json_module_accepts():
+    # orjson, when installed, rejects NaN, so this goes through the fallback
+    input_file = tempfile.NamedTemporaryFile(delete=False)
+    input_file.write(b'{"a": NaN, "b": 1}')
+    input_file.close()
+    output_file = tempfile.NamedTemporaryFile(delete=False)
+    output_file.close()
+    main(["b", "--file", input_file.name, "--output", output_file.name])
+    with open(output_file.name, "rb") as f:
+        assert f.read().decode("utf-8") == "1.0"
+    assert math.isnan(_load_json(b'{"a": NaN}')["a"])
+
+
+def test_load_json_reads_plain_input():
+    assert _load_json(nice_string) == {"hello": "there"}
+    assert _load_json(nice_string.encode("utf-8")) == {"hello": "there"}
@@ -0,0 +1,153 @@
+import json
+from typing import Any, List
+
+import pytest
+from mistql import query
+from mistql.expression import BaseExpression
+from mistql.fastparse import FastParseError, parse as fast_parse
+from mistql.parse import from_lark, mistql_parser, parse
+
+with open("shared/testdata.json", "rb") as f:
+    testdata = json.load(f)
+
+queries: List[str] = sorted(
+    {
+        assertion["query"]
+        for block in testdata["data"]
+        for innerblock in block["cases"]
+        for test in innerblock["cases"]
+        for assertion in test["assertions"]
+    }
+)
+
+
+expression_fields = (
+    "fn", "args", "name", "absolute", "value", "items", "entries", "stages",
+)
+
+
+def describe(ast: Any) -> Any:
+    """Reduce an expression tree to plain values that can be compared"""
+    if isinstance(ast, list):
+        return [describe(item) for item in ast]
+    if isinstance(ast, dict):
+        return {key: describe(value) for key, value in ast.items()}
+    if isinstance(ast, BaseExpression):
+        described = {"kind": type(ast).__name__}
+        for field in expression_fields:
+            if hasattr(ast, field):
+                described[field] = describe(getattr(ast, field))
+        return described
+    if hasattr(ast, "to_python"):
+        return ast.to_json(permissive=True)
+    return ast
+
+
+@pytest.mark.parametrize("raw", queries)
+def test_fast_parser_matches_lark(raw: str):
+    try:
+        fast = fast_parse(raw)
+    except FastParseError:
+        return
+    assert describe(fast) == describe(from_lark(mistql_parser.parse(raw)))
+
+
+def test_fast_parser_handles_shared_queries():
+    handled = 0
+    for raw in queries:
+        try:
+            fast_parse(raw)
+            handled += 1
+        except FastParseError:
+            pass
+    assert handled > len(queries) * 0.9
+
+
+def test_queries_the_fast_parser_defers_still_parse():
+    # Could be a subtraction or a call with a negated argument
+    with pytest.raises(FastParseError):
+        fast_parse("a -1")
+    expected = from_lark(mistql_parser.parse("a -1"))
+    assert describe(parse("a -1")) == describe(expected)
+
+
+minus_spellings = ["-", " -", "- ", " - "]
+minus_shapes = [
+    "a{}b",
+    "a{}b c",
+    "a{}b{}c d",
+    "f a{}b",
+    "f a{}b c",
+    "(a{}b) c",
+    "[a{}b, c]",
+    "a[b{}1]",
+    "@ | f{}1",
+    "@ | f a{}1",
+    "@ | (f{}1)",
+    "if true 1 + 2{}3 <= 0",
+]
+minus_queries = sorted(
+    {
+        shape.replace("{}", spelling)
+        for shape in minus_shapes
+        for spelling in minus_spellings
+    }
+)
+
+
+@pytest.mark.parametrize("raw", minus_queries)
+def test_fast_parser_matches_lark_around_minus(raw: str):
+    try:
+        fast = fast_parse(raw)
+    except FastParseError:
+        return
+    assert describe(fast) == describe(from_lark(mistql_parser.parse(raw)))
+
+
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "a - b c",
+        "a - b - c d",
+        "index - 1 [1,2,3]",
+        "[1,2,3] | index - 1",
+        "if true 1 + 2 - 3 <= 0",
+    ],
+)
+def test_calls_with_a_spaced_minus_are_deferred(raw: str):
+    # The grammar can read these as calls with a negated argument
+    with pytest.raises(FastParseError):
+        fast_parse(raw)
+    assert describe(parse(raw)) == describe(from_lark(mistql_parser.parse(raw)))
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("index - 1 [1,2,3]", 3),
+        ("[1,2,3] | index - 1", 3),
+        ("if true 1 + 2 - 3 <= 0", 3),
+    ],
+)
+def test_call_with_negated_argument_after_spaced_minus(raw: str, expected):
+    assert query(raw, None) == expected
+
+
+def test_invalid_string_literal_raises_json_error():
+    with pytest.raises(FastParseError):
+        fast_parse('"tab\there"')
+    with pytest.raises(json.JSONDecodeError):
+        parse('"tab\there"')
+
+
+@pytest.mark.parametrize("raw", ["[1,2,3][1: 2]", "[1,2,3][1 :]", "[1,2,3][ : 2 ]"])
+def test_spaced_colons_parse_the_same_on_both_paths(raw: str):
+    assert describe(fast_parse(raw)) == describe(
+        from_lark(mistql_parser.parse(raw))
+    )
+
+
+def test_spaced_colons_in_a_query_left_to_lark():
+    with pytest.raises(FastParseError):
+        fast_parse("[1,2,3][1: ] | index - 1")
+    assert query("[1,2,3][1: ] | index - 1", None) == 3
@@ -1,3 +1,4 @@
+from collections import OrderedDict
 from datetime import date, datetime, time
 from math import inf, nan
 
@@ -29,3 +30,21 @@ def test_datetimes_convert_to_iso_string():
     expected = RuntimeValue.of("2019-01-01T12:34:56")
     actual = input_garden_wall(datetime(2019, 1, 1, 12, 34, 56))
     assert actual == expected
+
+
+def test_subclasses_of_builtin_types_convert():
+    class Mapping(OrderedDict):
+        pass
+
+    class Number(int):
+        pass
+
+    expected = RuntimeValue.of({"a": 1.0})
+    assert input_garden_wall(Mapping(a=Number(1))) == expected
+
+
+def test_long_uniform_arrays_convert_like_mixed_ones():
+    floats = [0.5] * 20 + [nan, inf]
+    assert input_garden_wall(floats).to_python() == [0.5] * 20 + [None, None]
+    mixed = list(range(20)) + ["a", None]
+    assert input_garden_wall(mixed).to_python() == list(range(20)) + ["a", None]
@@ -1,4 +1,9 @@
 from mistql import __version__, query
+from mistql.exceptions import MistQLReferenceError, MistQLTypeError
+from mistql.execute import fold_constants, prepare, resolve_builtins
+from mistql.expression import FnExpression, ValueExpression
+from mistql.parse import parse
+import pytest
 import toml
 import json
 import os
@@ -14,3 +19,72 @@ def test_version():
 
 def test_query_is_callable():
     assert query and callable(query)
+
+
+def test_and_short_circuits():
+    assert query("false && (1 / 0)", None) is False
+
+
+def test_or_short_circuits():
+    assert query("true || (1 / 0)", None) is True
+
+
+def test_fused_pipe_stages():
+    data = [1, 2, 3, 4]
+    assert query("@ | map @ + 1 | filter @ > 2 | map @ * 10", data) == [30, 40, 50]
+
+
+def test_fused_pipe_respects_shadowed_builtins():
+    data = {"items": [1, 2], "filter": 1}
+    with pytest.raises(MistQLTypeError):
+        query("items | map @ + 1 | filter @ > 2", data)
+
+
+def test_map_arithmetic_matches_general_path():
+    data = [1, 2.5, -3]
+    assert query("map @ * 2 @", data) == [2, 5, -6]
+    assert query("map 10 - @ @", data) == [9, 7.5, 13]
+    assert query("map @ - @ @", data) == [0, 0, 0]
+    assert query("map (-(@ * 2 + 1)) @", data) == [-3, -6, 5]
+
+
+def test_map_arithmetic_keeps_null_semantics_between_operators():
+    with pytest.raises(MistQLTypeError):
+        query("map 1 / (@ * 1e308 * 10) @", [1])
+
+
+def test_nested_mutations_see_the_current_outer_item():
+    data = {"items": [{"a": 1, "xs": [1, 2]}, {"a": 10, "xs": [3]}]}
+    assert query("items | map (xs | map @ + a)", data) == [[2, 3], [13]]
+
+
+def test_mutations_do_not_see_keys_of_previous_items():
+    with pytest.raises(MistQLReferenceError):
+        query("map b @", [{"b": 1}, {"a": 2}])
+
+
+def test_literal_subtrees_fold_to_values():
+    ast = fold_constants(resolve_builtins(parse("[1, 2 + 3, {a: -4}]")))
+    assert isinstance(ast, ValueExpression)
+    assert ast.value.to_python() == [1, 5, {"a": -4}]
+
+
+def test_failing_literal_subtrees_are_not_folded():
+    ast = fold_constants(resolve_builtins(parse("false && (1 / 0)")))
+    assert isinstance(ast, FnExpression)
+
+
+def test_dot_chains_flatten_to_one_path_access():
+    ast = prepare(parse("a.b.c"))
+    assert isinstance(ast, FnExpression)
+    assert len(ast.args) == 3
+    assert query("a.b.c", {"a": {"b": {"c": 1}}}) == 1
+
+
+def test_path_access_is_not_exposed_in_dollar():
+    assert "./path" not in query("keys $", None)
+
+
+def test_string_literals_with_and_without_escapes():
+    assert query('"plain text"', None) == "plain text"
+    assert query('"say \\"hi\\"\\n\\u00e9"', None) == 'say "hi"\né'